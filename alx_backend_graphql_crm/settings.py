@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -73,16 +76,66 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'alx_backend_graphql_crm.wsgi.application'
+ASGI_APPLICATION = 'alx_backend_graphql_crm.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DB_ENGINE=django.db.backends.postgresql switches to PostgreSQL (DB_NAME,
+# DB_USER, DB_PASSWORD, DB_HOST, DB_PORT). Connections are kept open for
+# DB_CONN_MAX_AGE seconds (0 closes them after every request); on
+# PostgreSQL, DB_POOL=1 uses psycopg's connection pool instead, which
+# requires DB_CONN_MAX_AGE=0.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+DB_POOL = os.environ.get('DB_POOL') == '1'
+
+
+def database(name, host=None):
+    config = {
+        'ENGINE': DB_ENGINE,
+        'NAME': name,
+        'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': not DB_POOL and DB_CONN_MAX_AGE != 0,
+    }
+    if DB_ENGINE == 'django.db.backends.postgresql':
+        config.update({
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': host or os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+        })
+        if DB_POOL:
+            config['OPTIONS'] = {'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            }}
+    return config
+
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': database(os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3')),
+}
+
+# Read replica for GraphQL queries, exports and reporting tasks
+# (crm.replicas.ReplicaRouter). DB_REPLICA_NAME (and DB_REPLICA_HOST on
+# PostgreSQL) enables it; two SQLite files can stand in for primary and
+# replica locally. Tests read the replica alias from the test primary.
+if os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **database(os.environ['DB_REPLICA_NAME'], host=os.environ.get('DB_REPLICA_HOST')),
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['crm.replicas.ReplicaRouter']
+
+# After a mutation, reads stay on the primary for the rest of the request
+# and, through STICKY_COOKIE, for the client's next STICKY_SECONDS
+DATABASE_REPLICAS = {
+    'READ_ALIAS': 'replica',
+    'STICKY_COOKIE': 'crm_primary',
+    'STICKY_SECONDS': 10,
 }
 
 
@@ -129,9 +182,96 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 GRAPHENE = {
-    'SCHEMA': 'alx_backend_graphql_crm.schema.schema'
+    'SCHEMA': 'alx_backend_graphql_crm.schema.schema',
+    'MIDDLEWARE': ['crm.instrumentation.ProfilingMiddleware'],
+}
+
+# Parsed/validated GraphQL documents kept in memory per process
+GRAPHQL_DOCUMENT_CACHE_SIZE = 256
+
+# Cache alias holding automatic persisted queries (hash -> query text)
+GRAPHQL_PERSISTED_QUERY_CACHE = 'default'
+
+# Opt-in result cache for read-only root Query fields, invalidated by model signals
+GRAPHQL_RESPONSE_CACHE = {
+    'ENABLED': False,
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    'FIELDS': ['customers', 'allCustomers', 'products', 'allProducts'],
+}
+
+# Per-request profiling (crm.instrumentation), aggregated at /metrics/.
+# Send the HEADER to receive the profile in `extensions.profile`; only those
+# requests have their resolvers timed unless RESOLVERS is on. Operations
+# are labelled by name only if listed in OPERATIONS (None: the first
+# MAX_OPERATIONS names seen), otherwise as 'anonymous'.
+GRAPHQL_METRICS = {
+    'ENABLED': True,
+    'HEADER': 'X-GraphQL-Profile',
+    'QUERY_COUNT_WARNING': 50,
+    'SLOW_REQUEST_MS': 1000,
+    'RESOLVERS': False,
+    'OPERATIONS': None,
+    'MAX_OPERATIONS': 100,
 }
 
+# Per-request budgets enforced by crm.complexity.QueryCostRule
+GRAPHQL_QUERY_LIMITS = {
+    'MAX_DEPTH': 8,
+    'MAX_COST': 50000,
+    'NESTED_PAGE_SIZE': 10,
+}
+
+# Full-text `search` argument of the customer/product/order connections
+# (crm.search): FTS5 on SQLite, tsvector on PostgreSQL
+SEARCH_INDEX = {
+    'RANK_WINDOW': 10000,
+    'BATCH_SIZE': 1000,
+}
+
+# Order reminder pipeline (crm.reminders); BACKEND is any BaseReminderBackend
+ORDER_REMINDERS = {
+    'BACKEND': 'crm.reminders.FileReminderBackend',
+    'OPTIONS': {'path': '/tmp/order_reminders_log.txt'},
+    'DAYS': 7,
+    'BATCH_SIZE': 500,
+}
+
+# Celery (the app in crm/celery.py loads this module and reads the
+# CELERY_* settings). Chunked maintenance jobs are chords, so they need a
+# result backend; set CELERY_TASK_ALWAYS_EAGER=1 to run them inline (tests,
+# local runs).
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', 'redis://localhost:6379/1')
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1'
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
+
+CELERY_BEAT_SCHEDULE = {
+    'generate-crm-report': {
+        'task': 'crm.tasks.generate_crm_report',
+        'schedule': crontab(day_of_week='mon', hour=6, minute=0),
+    },
+}
+
+# Channel layer carrying subscription events (crm.subscriptions). The
+# in-memory layer only reaches subscribers in the same process; set
+# CHANNEL_REDIS_URL (needs channels_redis) when running several processes
+# or publishing from Celery workers.
+if os.environ.get('CHANNEL_REDIS_URL'):
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [os.environ['CHANNEL_REDIS_URL']]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    }
+
+# Rows per PK-range chunk for the fan-out maintenance tasks (crm.chunks)
+MAINTENANCE_CHUNK_SIZE = 1000
+
 CRONJOBS = [
     ('0 */12 * * *', 'crm.cron.update_low_stock'),
 ]
@@ -0,0 +1,18 @@
+import asyncio
+
+
+def in_event_loop():
+    """
+    True when running inside an event loop (the async GraphQL view), where
+    the ORM may only be used through its async API.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+async def alist(queryset):
+    """Evaluate a queryset with async iteration."""
+    return [obj async for obj in queryset]
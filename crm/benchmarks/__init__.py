@@ -0,0 +1,7 @@
+"""
+Reproducible GraphQL API benchmarks.
+
+`data.generate()` seeds a deterministic dataset at a named scale and
+`runner.run_scenarios()` replays the scripted operations in `scenarios`
+through Django's test client. Run them with `manage.py run_benchmarks`.
+"""
@@ -0,0 +1,146 @@
+import hashlib
+import random
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from crm.models import Customer, Product, Order, OrderLine
+from crm.rollups import rebuild_rollups
+from crm.search import rebuild_index
+
+# name -> (customers, products, orders)
+SCALES = {
+    '1k': (1_000, 100, 1_000),
+    '100k': (100_000, 10_000, 100_000),
+    '1m': (1_000_000, 100_000, 1_000_000),
+}
+
+PRODUCTS_PER_ORDER = 3
+
+
+@contextmanager
+def benchmark_database(keepdb=False):
+    """
+    Point the default connection at a throwaway test database for the
+    block, created like the test runner does and destroyed afterwards
+    (unless `keepdb`). Refuses to run when that would be the configured
+    database itself, so seeding never touches real data.
+    """
+    settings_dict = connection.settings_dict
+    old_name = settings_dict['NAME']
+    if settings_dict.get('TEST', {}).get('NAME') == old_name:
+        raise CommandError("The test database name is the configured database; refusing to benchmark it")
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        if connection.settings_dict['NAME'] == old_name:
+            raise CommandError("Could not switch to a throwaway test database; refusing to benchmark")
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def stable_uuid(seed, kind, index):
+    """Primary key of the `index`-th generated row, derived instead of stored."""
+    digest = hashlib.md5(f"{seed}:{kind}:{index}".encode()).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def is_seeded(scale='1k', seed=42):
+    """Whether the database holds the dataset generate(scale, seed) inserts."""
+    customers, products, orders = SCALES[scale]
+    return (
+        Customer.objects.count() == customers
+        and Product.objects.count() == products
+        and Order.objects.count() == orders
+        and Customer.objects.filter(pk=stable_uuid(seed, 'customer', customers - 1)).exists()
+    )
+
+
+def _batched(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def generate(scale='1k', seed=42, batch_size=5000, stdout=None):
+    """
+    Insert a deterministic dataset of the given scale and rebuild the sales
+    rollups and the search index. Rows are streamed in batches and primary
+    keys are derived from (seed, index), so even the 1m scale keeps only
+    product prices in memory.
+    Returns the (customers, products, orders) counts.
+    """
+    customers, products, orders = SCALES[scale]
+    rng = random.Random(seed)
+
+    def log(message):
+        if stdout is not None:
+            stdout.write(message)
+
+    def insert(model, rows):
+        for batch in _batched(rows, batch_size):
+            model.objects.bulk_create(batch, batch_size=batch_size)
+
+    log(f"Seeding {customers} customers")
+    insert(Customer, (
+        Customer(
+            customer_id=stable_uuid(seed, 'customer', i),
+            name=f"Customer {i}",
+            email=f"bench-{seed}-{i}@example.com",
+            phone=rng.choice(['+1', '+234', '+254', '+255']) + str(rng.randint(10**8, 10**9)),
+        )
+        for i in range(customers)
+    ))
+
+    log(f"Seeding {products} products")
+    prices = [Decimal(rng.randint(100, 100000)) / 100 for _ in range(products)]
+    insert(Product, (
+        Product(
+            product_id=stable_uuid(seed, 'product', i),
+            name=f"Product {i}",
+            price=prices[i],
+            stock=rng.randint(0, 200),
+        )
+        for i in range(products)
+    ))
+
+    log(f"Seeding {orders} orders")
+    lines = []
+
+    def order_rows():
+        for i in range(orders):
+            picked = rng.sample(range(products), k=min(PRODUCTS_PER_ORDER, products))
+            order_id = stable_uuid(seed, 'order', i)
+            lines.extend((order_id, stable_uuid(seed, 'product', p), prices[p]) for p in picked)
+            yield Order(
+                order_id=order_id,
+                customer_id=stable_uuid(seed, 'customer', rng.randrange(customers)),
+                total_amount=sum(prices[p] for p in picked),
+            )
+
+    for batch in _batched(order_rows(), batch_size):
+        Order.objects.bulk_create(batch, batch_size=batch_size)
+        OrderLine.objects.bulk_create(
+            [
+                OrderLine(order_id=order_id, product_id=product_id, unit_price=price, line_total=price)
+                for order_id, product_id, price in lines
+            ],
+            batch_size=batch_size,
+        )
+        lines.clear()
+
+    log("Rebuilding sales rollups")
+    rebuild_rollups(batch_size=batch_size)
+    log("Rebuilding search index")
+    rebuild_index(batch_size=batch_size)
+    return customers, products, orders
@@ -0,0 +1,100 @@
+import json
+import math
+import time
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values`."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: list = field(default_factory=list)   # seconds per operation
+    queries: list = field(default_factory=list)     # SQL queries per operation
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def iterations(self):
+        return len(self.latencies)
+
+    def summary(self):
+        return {
+            'scenario': self.name,
+            'iterations': self.iterations,
+            'errors': self.errors,
+            'ops_per_sec': round(self.iterations / self.elapsed, 1) if self.elapsed else 0.0,
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+            'queries_avg': round(sum(self.queries) / len(self.queries), 1) if self.queries else 0.0,
+            'queries_max': max(self.queries, default=0),
+        }
+
+
+def execute(client, path, query, variables):
+    response = client.post(
+        path, json.dumps({'query': query, 'variables': variables}), content_type='application/json'
+    )
+    return response.status_code, response.json()
+
+
+def run_scenario(scenario, iterations=100, warmup=5, path='/graphql/', client=None):
+    """
+    Replay `scenario` through the test client: `warmup` untimed operations,
+    then `iterations` timed ones, recording latency and SQL query count.
+    """
+    client = client or Client()
+    for _ in range(warmup):
+        query, variables = scenario.next_request()
+        _, body = execute(client, path, query, variables)
+        scenario.after_response(body.get('data'))
+
+    result = ScenarioResult(scenario.name)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        query, variables = scenario.next_request()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            status, body = execute(client, path, query, variables)
+            result.latencies.append(time.perf_counter() - start)
+        result.queries.append(len(captured.captured_queries))
+        if status != 200 or body.get('errors'):
+            result.errors += 1
+        scenario.after_response(body.get('data'))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def run_scenarios(scenarios, **kwargs):
+    return [run_scenario(scenario, **kwargs) for scenario in scenarios]
+
+
+COLUMNS = [
+    ('scenario', 'Scenario', '<28'),
+    ('iterations', 'Ops', '>6'),
+    ('errors', 'Err', '>4'),
+    ('ops_per_sec', 'Ops/s', '>8'),
+    ('p50_ms', 'p50 ms', '>9'),
+    ('p99_ms', 'p99 ms', '>9'),
+    ('queries_avg', 'SQL avg', '>8'),
+    ('queries_max', 'SQL max', '>8'),
+]
+
+
+def format_table(summaries):
+    header = "  ".join(f"{title:{fmt}}" for _, title, fmt in COLUMNS)
+    lines = [header, "-" * len(header)]
+    for summary in summaries:
+        lines.append("  ".join(f"{summary[key]:{fmt}}" for key, _, fmt in COLUMNS))
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+import itertools
+import random
+
+from crm.models import Customer, Product
+
+NESTED_ORDERS = """
+query NestedOrders($after: String) {
+  allOrders(first: 50, after: $after) {
+    pageInfo { endCursor hasNextPage }
+    edges { node {
+      orderId orderDate totalAmount
+      customer { name email }
+      product { edges { node { name price } } }
+    } }
+  }
+}"""
+
+FILTERED_PRODUCTS = """
+query FilteredProducts($priceGte: Decimal, $lowStock: Boolean) {
+  products(first: 50, priceGte: $priceGte, lowStock: $lowStock) {
+    edges { node { productId name price stock } }
+  }
+}"""
+
+CREATE_ORDER = """
+mutation CreateOrder($customerId: ID!, $productIds: [ID]!) {
+  createOrder(input: {customerId: $customerId, productIds: $productIds}) {
+    order { orderId totalAmount }
+  }
+}"""
+
+BULK_CREATE_CUSTOMERS = """
+mutation BulkCreateCustomers($input: [CustomerInput]!) {
+  bulkCreateCustomers(input: $input) { customers { customerId } errors }
+}"""
+
+UPDATE_LOW_STOCK = """
+mutation UpdateLowStock {
+  updateLowStockProducts(threshold: 10, amount: 1, limit: 20) { updatedCount }
+}"""
+
+
+class Scenario:
+    """
+    A named GraphQL operation. next_request() returns the (query,
+    variables) of the next iteration; after_response() lets stateful
+    scenarios (pagination) read the previous result.
+    """
+
+    name = None
+    query = None
+
+    def setup(self, rng):
+        self.rng = rng
+
+    def next_request(self):
+        return self.query, {}
+
+    def after_response(self, data):
+        pass
+
+
+class NestedOrders(Scenario):
+    name = 'allOrders nested pages'
+    query = NESTED_ORDERS
+
+    def setup(self, rng):
+        super().setup(rng)
+        self.cursor = None
+
+    def next_request(self):
+        return self.query, {'after': self.cursor}
+
+    def after_response(self, data):
+        page = (data or {}).get('allOrders') or {}
+        info = page.get('pageInfo') or {}
+        # Walk the connection page by page, starting over at the end
+        self.cursor = info.get('endCursor') if info.get('hasNextPage') else None
+
+
+class FilteredProducts(Scenario):
+    name = 'products priceGte/lowStock'
+    query = FILTERED_PRODUCTS
+
+    def next_request(self):
+        variables = {'priceGte': str(self.rng.choice([10, 100, 500]))}
+        if self.rng.random() < 0.5:
+            variables['lowStock'] = True
+        return self.query, variables
+
+
+class CreateOrderManyProducts(Scenario):
+    name = 'createOrder x50 products'
+    query = CREATE_ORDER
+    products_per_order = 50
+
+    def setup(self, rng):
+        super().setup(rng)
+        self.customer_ids = [str(pk) for pk in Customer.objects.values_list('pk', flat=True)[:1000]]
+        self.product_ids = [str(pk) for pk in Product.objects.filter(stock__gt=0).values_list('pk', flat=True)[:5000]]
+
+    def next_request(self):
+        k = min(self.products_per_order, len(self.product_ids))
+        return self.query, {
+            'customerId': self.rng.choice(self.customer_ids),
+            'productIds': self.rng.sample(self.product_ids, k=k),
+        }
+
+
+class BulkCreateCustomers(Scenario):
+    name = 'bulkCreateCustomers x100'
+    query = BULK_CREATE_CUSTOMERS
+    batch = 100
+
+    def setup(self, rng):
+        super().setup(rng)
+        self.counter = itertools.count()
+
+    def next_request(self):
+        run = next(self.counter)
+        token = self.rng.getrandbits(32)
+        return self.query, {'input': [
+            {'name': f"Bulk {run}-{i}", 'email': f"bulk-{token:08x}-{run}-{i}@example.com", 'phone': '+254700000000'}
+            for i in range(self.batch)
+        ]}
+
+
+class UpdateLowStock(Scenario):
+    name = 'updateLowStockProducts'
+    query = UPDATE_LOW_STOCK
+
+
+SCENARIOS = {
+    'nested_orders': NestedOrders,
+    'filtered_products': FilteredProducts,
+    'create_order': CreateOrderManyProducts,
+    'bulk_create_customers': BulkCreateCustomers,
+    'update_low_stock': UpdateLowStock,
+}
+
+
+def get_scenarios(names=None, seed=42):
+    """Instantiate and set up the named scenarios (all of them by default)."""
+    scenarios = []
+    for name in names or SCENARIOS:
+        scenario = SCENARIOS[name]()
+        scenario.setup(random.Random(f"{seed}:{name}"))
+        scenarios.append(scenario)
+    return scenarios
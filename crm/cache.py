@@ -0,0 +1,131 @@
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from graphql import OperationType, TypeInfo, TypeInfoVisitor, get_named_type, print_ast, visit
+from graphql.language import FieldNode, Visitor
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    'FIELDS': ['customers', 'allCustomers', 'products', 'allProducts'],
+}
+
+
+class _ModelCollector(Visitor):
+    """Collect the Django models behind every object type a document touches."""
+
+    def __init__(self, type_info):
+        super().__init__()
+        self.type_info = type_info
+        self.models = set()
+
+    def enter_field(self, node, *args):
+        named = get_named_type(self.type_info.get_type())
+        graphene_type = getattr(named, 'graphene_type', None)
+        meta = getattr(graphene_type, '_meta', None)
+        model = getattr(meta, 'model', None)
+        if model is None:
+            # Connection types point at their node type
+            node_type = getattr(meta, 'node', None)
+            model = getattr(getattr(node_type, '_meta', None), 'model', None)
+        if model is not None:
+            self.models.add(model)
+
+
+class ResponseCache:
+    """
+    Opt-in cache of complete results for read-only root Query fields.
+
+    Entries are keyed on the printed document, operation name, variables and
+    a version token for every model the query reads. Saving or deleting one
+    of those models replaces its token, which orphans the stale entries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, 'GRAPHQL_RESPONSE_CACHE', {})}
+
+    @property
+    def cache(self):
+        return caches[self.config['ALIAS']]
+
+    @property
+    def enabled(self):
+        return self.config['ENABLED']
+
+    def _version_key(self, model):
+        return f"crm:gql:version:{model._meta.label_lower}"
+
+    def _version(self, model):
+        return self.cache.get_or_set(self._version_key(model), uuid.uuid4().hex, None)
+
+    def invalidate(self, *models):
+        """
+        Drop cached results that read any of `models`. Runs once the current
+        transaction commits so readers cannot re-cache uncommitted state.
+        """
+        def bump():
+            for model in models:
+                self.cache.set(self._version_key(model), uuid.uuid4().hex, None)
+        transaction.on_commit(bump)
+
+    def key_for(self, schema, document, operation_ast, variables):
+        """
+        Return the cache key for an operation, or None when it is not cacheable.
+        """
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None
+        fields = set(self.config['FIELDS'])
+        for selection in operation_ast.selection_set.selections:
+            if not isinstance(selection, FieldNode):
+                return None
+            if selection.name.value != '__typename' and selection.name.value not in fields:
+                return None
+
+        type_info = TypeInfo(schema)
+        collector = _ModelCollector(type_info)
+        visit(document, TypeInfoVisitor(type_info, collector))
+        versions = sorted(
+            f"{model._meta.label_lower}={self._version(model)}" for model in collector.models
+        )
+        payload = json.dumps(
+            [print_ast(document), operation_ast.name and operation_ast.name.value, variables or {}, versions],
+            sort_keys=True,
+            default=str,
+        )
+        return "crm:gql:result:" + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        data = self.cache.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, self.config['TIMEOUT'])
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+response_cache = ResponseCache()
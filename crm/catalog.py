@@ -0,0 +1,152 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import response_cache
+from .models import Product
+from .search import index_objects
+from .subscriptions import publish_stock_changed
+
+FORMATS = ('csv', 'ndjson')
+
+
+@dataclass
+class UpsertResult:
+    """Counts and row errors of one chunk of upsert_products()."""
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    errors: list = field(default_factory=list)  # (row index, message)
+
+
+def read_rows(stream, format):
+    """
+    Lazily parse a catalog feed into row dicts: CSV with a sku,name,price,stock
+    header, or NDJSON objects with the same keys. Unparseable NDJSON lines
+    are yielded as their ValueError so they count as rejected rows.
+    """
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for text in stream:
+        if not text.strip():
+            continue
+        try:
+            yield json.loads(text)
+        except ValueError as e:
+            yield e
+
+
+def build_product(data):
+    """
+    Validate one feed row like CreateProduct does and return an unsaved
+    Product; `stock` is None when the row does not set it. Raises
+    ValueError with the reason the row was rejected.
+    """
+    if isinstance(data, Exception):
+        raise ValueError(f"Invalid row: {data}")
+    if not isinstance(data, dict):
+        raise ValueError("Invalid row: expected an object")
+    sku = str(data.get('sku') or '').strip()
+    if not sku:
+        raise ValueError("SKU is required")
+
+    try:
+        price = Decimal(str(data.get('price')))
+    except InvalidOperation:
+        raise ValueError(f"Invalid price: {data.get('price')}")
+    if not price.is_finite() or price <= 0:
+        raise ValueError("Price must be positive")
+
+    stock = data.get('stock')
+    if stock in (None, ''):
+        stock = None
+    else:
+        try:
+            stock = int(stock)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid stock: {stock}")
+        if stock < 0:
+            raise ValueError("Stock cannot be negative")
+
+    product = Product(sku=sku, name=data.get('name') or '', price=price, stock=stock or 0)
+    try:
+        product.full_clean(exclude=['product_id'], validate_unique=False)
+    except ValidationError as e:
+        raise ValueError(str(e))
+    if stock is None:
+        product.stock = None
+    return product
+
+
+def upsert_products(rows, chunk_size=1000):
+    """
+    Create or update products from feed rows, matched by SKU. Yields an
+    UpsertResult per chunk, so callers can report progress while only one
+    chunk is held in memory.
+
+    Each chunk is validated in memory, the existing SKUs are read with one
+    query and everything is written with bulk_create(update_conflicts=True)
+    in one transaction; a SKU inserted concurrently is updated instead of
+    failing the chunk. Rows without a stock value leave the stock of
+    existing products alone. A SKU repeated within a chunk is rejected;
+    across chunks the later row wins.
+    """
+    rows = iter(enumerate(rows))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield _upsert_chunk(chunk)
+
+
+def _upsert_chunk(chunk):
+    result = UpsertResult(rows=len(chunk))
+    products = {}  # sku -> Product, first occurrence wins
+    for index, data in chunk:
+        try:
+            product = build_product(data)
+        except ValueError as e:
+            result.errors.append((index, f"Row {index + 1}: {e}"))
+            continue
+        if product.sku in products:
+            result.errors.append((index, f"Row {index + 1}: SKU '{product.sku}' is duplicated in the chunk"))
+            continue
+        products[product.sku] = product
+    if not products:
+        return result
+
+    with transaction.atomic():
+        existing = {
+            sku: (pk, stock)
+            for sku, pk, stock in Product.objects.filter(sku__in=products).values_list('sku', 'pk', 'stock')
+        }
+        with_stock, without_stock = [], []
+        for product in products.values():
+            if product.stock is None:
+                product.stock = 0  # only used if the SKU turns out to be new
+                without_stock.append(product)
+            else:
+                with_stock.append(product)
+
+        for batch, fields in ((with_stock, ['name', 'price', 'stock']), (without_stock, ['name', 'price'])):
+            if batch:
+                Product.objects.bulk_create(
+                    batch, update_conflicts=True, unique_fields=['sku'], update_fields=fields
+                )
+        # A SKU inserted concurrently keeps its own primary key, so read them back
+        index_objects(Product, Product.objects.filter(sku__in=products).values_list('pk', flat=True))
+
+        result.updated = len(existing)
+        result.created = len(products) - result.updated
+        response_cache.invalidate(Product)
+        publish_stock_changed([
+            existing[product.sku][0] for product in with_stock
+            if product.sku in existing and existing[product.sku][1] != product.stock
+        ])
+    return result
@@ -0,0 +1,47 @@
+from celery import chord
+from django.conf import settings
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def chunk_size_setting():
+    return getattr(settings, 'MAINTENANCE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def pk_ranges(queryset, chunk_size=None):
+    """
+    Yield inclusive (first_pk, last_pk) ranges of at most `chunk_size` rows.
+
+    The boundaries come from one streamed scan of the primary key index;
+    they are returned as strings so they survive Celery's JSON serializer.
+    """
+    chunk_size = chunk_size or chunk_size_setting()
+    first = last = None
+    count = 0
+    pks = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=max(chunk_size, 2000))
+    for pk in pks:
+        if first is None:
+            first = pk
+        last = pk
+        count += 1
+        if count == chunk_size:
+            yield str(first), str(last)
+            first, count = None, 0
+    if first is not None:
+        yield str(first), str(last)
+
+
+def fan_out(chunk_task, queryset, reducer, chunk_size=None, **kwargs):
+    """
+    Run `chunk_task(first_pk, last_pk, **kwargs)` for every PK range of
+    `queryset` as a chord, then call `reducer` with the list of partial
+    results. `reducer` is a signature, so it can carry its own arguments.
+
+    The chunks run in parallel across workers (or inline when
+    CELERY_TASK_ALWAYS_EAGER is set); a result backend is required for the
+    chord to collect them. Returns the reducer's AsyncResult.
+    """
+    header = [chunk_task.s(first, last, **kwargs) for first, last in pk_ranges(queryset, chunk_size)]
+    if not header:
+        return reducer.clone(args=([],)).apply_async()
+    return chord(header)(reducer)
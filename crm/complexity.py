@@ -0,0 +1,136 @@
+from django.conf import settings
+from graphene_django.settings import graphene_settings
+from graphql import GraphQLError, GraphQLObjectType, GraphQLInterfaceType, get_named_type
+from graphql.execution.values import get_argument_values
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+from graphql.validation import ValidationRule
+
+
+DEFAULTS = {
+    'MAX_DEPTH': 8,
+    'MAX_COST': 50000,
+    # Page size assumed for a connection without `first`/`last` inside
+    # another connection; top-level ones assume RELAY_CONNECTION_MAX_LIMIT
+    'NESTED_PAGE_SIZE': 10,
+}
+
+
+def query_limits():
+    return {**DEFAULTS, **getattr(settings, 'GRAPHQL_QUERY_LIMITS', {})}
+
+
+class QueryCostRule(ValidationRule):
+    """
+    Static depth and cost analysis for an operation.
+
+    Every field costs 1. Fields taking `first`/`last` (relay connections)
+    multiply the cost of their children by the requested page size. When
+    neither is given that is RELAY_CONNECTION_MAX_LIMIT for a top-level
+    connection and NESTED_PAGE_SIZE for one nested in another. Connection
+    `edges`/`node` wrappers add neither cost nor depth. Operations over the
+    depth or cost budget are reported as validation errors, so no resolver
+    runs.
+
+    Use `QueryCostRule.for_request(variables)` to bind the request variables;
+    the computed figures are left in the returned class' `report`.
+    """
+
+    variables = None
+    max_depth = DEFAULTS['MAX_DEPTH']
+    max_cost = DEFAULTS['MAX_COST']
+    nested_page_size = DEFAULTS['NESTED_PAGE_SIZE']
+    report = None
+
+    @classmethod
+    def for_request(cls, variables=None, max_depth=None, max_cost=None):
+        limits = query_limits()
+        return type(cls.__name__, (cls,), {
+            'variables': variables or {},
+            'max_depth': max_depth if max_depth is not None else limits['MAX_DEPTH'],
+            'max_cost': max_cost if max_cost is not None else limits['MAX_COST'],
+            'nested_page_size': limits['NESTED_PAGE_SIZE'],
+            'report': {},
+        })
+
+    def enter_operation_definition(self, node, *_args):
+        schema = self.context.schema
+        root_type = schema.get_root_type(node.operation)
+        if root_type is None:
+            return self.SKIP
+        cost, depth = self._measure(node.selection_set, root_type, set(), nested=False)
+        name = node.name.value if node.name else None
+        if self.report is not None:
+            self.report[name] = {
+                'cost': cost,
+                'depth': depth,
+                'maxCost': self.max_cost,
+                'maxDepth': self.max_depth,
+            }
+        if depth > self.max_depth:
+            self.report_error(GraphQLError(
+                f"Query depth {depth} exceeds the maximum allowed depth of {self.max_depth}",
+                node,
+                extensions={'code': 'QUERY_TOO_DEEP', 'depth': depth, 'maxDepth': self.max_depth},
+            ))
+        if cost > self.max_cost:
+            self.report_error(GraphQLError(
+                f"Query cost {cost} exceeds the maximum allowed cost of {self.max_cost}",
+                node,
+                extensions={'code': 'QUERY_TOO_COSTLY', 'cost': cost, 'maxCost': self.max_cost},
+            ))
+        return self.SKIP
+
+    def _fields(self, selection_set, visited):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                yield selection
+            elif isinstance(selection, InlineFragmentNode):
+                yield from self._fields(selection.selection_set, visited)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                if fragment is None or name in visited:
+                    continue
+                yield from self._fields(fragment.selection_set, visited | {name})
+
+    def _page_size(self, field_def, node, nested):
+        """Return (page size, whether the field is a connection)."""
+        if 'first' not in field_def.args and 'last' not in field_def.args:
+            return 1, False
+        try:
+            args = get_argument_values(field_def, node, self.variables)
+        except Exception:
+            args = {}
+        size = args.get('first')
+        if size is None:
+            size = args.get('last')
+        if size is None:
+            size = self.nested_page_size if nested else graphene_settings.RELAY_CONNECTION_MAX_LIMIT or 1
+        return max(size, 0), True
+
+    def _measure(self, selection_set, parent_type, visited, nested):
+        """Return (cost, depth) of a selection set on `parent_type`."""
+        if selection_set is None or not isinstance(parent_type, (GraphQLObjectType, GraphQLInterfaceType)):
+            return 0, 0
+
+        wrapper = parent_type.name.endswith(('Connection', 'Edge'))
+        total_cost, max_depth = 0, 0
+        for node in self._fields(selection_set, visited):
+            name = node.name.value
+            if name.startswith('__'):
+                continue
+            field_def = parent_type.fields.get(name)
+            if field_def is None:
+                continue
+            page_size, connection = self._page_size(field_def, node, nested)
+            child_cost, child_depth = self._measure(
+                node.selection_set, get_named_type(field_def.type), visited, nested or connection
+            )
+            if wrapper and name in ('edges', 'node'):
+                total_cost += child_cost
+            else:
+                total_cost += 1 + page_size * child_cost
+            if node.selection_set is not None and not (wrapper and name in ('edges', 'node')):
+                child_depth += 1
+            max_depth = max(max_depth, child_depth)
+        return total_cost, max_depth
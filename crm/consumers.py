@@ -0,0 +1,107 @@
+import asyncio
+from types import SimpleNamespace
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from graphene_django.settings import graphene_settings
+from graphql import ExecutionResult, GraphQLError, OperationType, get_operation_ast, parse, subscribe, validate
+
+from .complexity import QueryCostRule
+
+
+class GraphQLSubscriptionConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Serves `Subscription` operations over the graphql-transport-ws protocol.
+
+    Each `subscribe` message starts an asyncio task pumping the source
+    stream into `next` messages until the client sends `complete` or the
+    socket closes. Queries and mutations stay on the HTTP endpoints.
+    """
+
+    subprotocol = "graphql-transport-ws"
+
+    async def connect(self):
+        self.operations = {}
+        self.acknowledged = False
+        if self.subprotocol not in self.scope.get("subprotocols", []):
+            await self.close(code=4406)
+            return
+        await self.accept(self.subprotocol)
+
+    async def disconnect(self, code):
+        for task in self.operations.values():
+            task.cancel()
+        self.operations.clear()
+
+    async def receive_json(self, content, **kwargs):
+        message_type = content.get("type")
+        if message_type == "connection_init":
+            self.acknowledged = True
+            await self.send_json({"type": "connection_ack"})
+        elif message_type == "ping":
+            await self.send_json({"type": "pong"})
+        elif message_type == "pong":
+            pass
+        elif not self.acknowledged:
+            await self.close(code=4401)
+        elif message_type == "subscribe":
+            await self.start(content.get("id"), content.get("payload") or {})
+        elif message_type == "complete":
+            task = self.operations.pop(content.get("id"), None)
+            if task is not None:
+                task.cancel()
+        else:
+            await self.close(code=4400)
+
+    @property
+    def schema(self):
+        return graphene_settings.SCHEMA.graphql_schema
+
+    async def start(self, op_id, payload):
+        if op_id is None or op_id in self.operations:
+            await self.close(code=4409)
+            return
+
+        variables = payload.get("variables") or {}
+        try:
+            document = parse(payload.get("query") or "")
+        except GraphQLError as e:
+            await self.send_error(op_id, [e])
+            return
+
+        errors = validate(self.schema, document)
+        if not errors:
+            errors = validate(self.schema, document, [QueryCostRule.for_request(variables)])
+        operation = get_operation_ast(document, payload.get("operationName"))
+        if not errors and (operation is None or operation.operation != OperationType.SUBSCRIPTION):
+            errors = [GraphQLError("Only subscription operations are served over WebSocket.")]
+        if errors:
+            await self.send_error(op_id, errors)
+            return
+
+        result = await subscribe(
+            self.schema,
+            document,
+            # Resolvers keep per-operation state (loaders) on the context
+            context_value=SimpleNamespace(scope=self.scope, user=self.scope.get("user")),
+            variable_values=variables,
+            operation_name=payload.get("operationName"),
+        )
+        if isinstance(result, ExecutionResult):
+            await self.send_error(op_id, result.errors)
+            return
+        self.operations[op_id] = asyncio.ensure_future(self.pump(op_id, result))
+
+    async def pump(self, op_id, stream):
+        try:
+            async for result in stream:
+                payload = {"data": result.data}
+                if result.errors:
+                    payload["errors"] = [error.formatted for error in result.errors]
+                await self.send_json({"id": op_id, "type": "next", "payload": payload})
+            await self.send_json({"id": op_id, "type": "complete"})
+        finally:
+            self.operations.pop(op_id, None)
+            await stream.aclose()
+
+    async def send_error(self, op_id, errors):
+        await self.send_json({"id": op_id, "type": "error", "payload": [error.formatted for error in errors]})
@@ -1,44 +1,16 @@
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import datetime
+import logging
 
+from .tasks import restock_low_stock
 
-def update_low_stock():
-    transport=RequestsHTTPTransport(
-        url='http://localhost:8000/graphql',
-    )
-
-    client=Client(transport=transport)
+logger = logging.getLogger(__name__)
 
 
-    mutation_query=gql(
-        """
-        mutation{
-            updateLowStockProducts{
-                success
-                updatedCount
-                message
-                products {
-                name
-                stock
-                }
-            }
-        }
+def update_low_stock():
+    """
+    Queue the chunked restock; the reducer task appends the restocked
+    products to /tmp/low_stock_updates_log.txt.
     """
-    )
-    log_path = '/tmp/low_stock_updates_log.txt'
     try:
-        result=client.execute(mutation_query)
-        timestamp=datetime.now().isoformat()
-
-        payload = result["updateLowStockProducts"]
-
-        if payload["success"] and payload["updatedCount"] > 0:
-            with open(log_path, "a") as log_file:
-                for product in payload["products"]:
-                    log_file.write(
-                        f"[{timestamp}] Updated {product['name']} stock to {product['stock']}\n"
-                    )
-
-    except Exception as e:
-        print("An Error occured: {e}")
\ No newline at end of file
+        restock_low_stock.delay()
+    except Exception:
+        logger.exception("Could not queue the low-stock restock")
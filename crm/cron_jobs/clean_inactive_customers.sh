@@ -1,9 +1,12 @@
 PROJECT_DIR="/home/kamau/Documents/EDUCATION/programming_bckend/projects/ALX/alx-backend-graphql_crm"
+LOG_FILE=/tmp/customer_cleanup_log.txt
+BATCH_SIZE=${BATCH_SIZE:-500}
 cd $PROJECT_DIR || exit 1
 
 #If using a virtual environment
 source $PROJECT_DIR/.venv/bin/activate
 
-DELETED_COUNT=$(python3 manage.py customer_cleanup)
+# Progress/throughput lines go to stderr and are appended to the log as they happen
+DELETED_COUNT=$(python3 manage.py customer_cleanup --batch-size "$BATCH_SIZE" "$@" 2>>"$LOG_FILE")
 
-echo "$(date '+%Y-%m-%d %H:%M:%S') - Deleted customers: $DELETED_COUNT" >> /tmp/customer_cleanup_log.txt
\ No newline at end of file
+echo "$(date '+%Y-%m-%d %H:%M:%S') - Deleted customers: $DELETED_COUNT" >> "$LOG_FILE"
@@ -1,49 +1,25 @@
-from gql import gql, Client
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import timedelta, datetime
-
-transport = RequestsHTTPTransport(
-    url='http://localhost:8000/graphql/',
-)
-
-
-client = Client(transport=transport)
-timeframe=datetime.now()-timedelta(days=7)
-
-
-
-query=gql(
-    """
-    query($after: String!){
-        allOrders(orderDate: $after){
-        edges{
-            node{
-                id
-                customer{
-                    email
-                    }
-                }
-            }
-        }
-    }
 """
-)
+Cron entry point for the order reminders.
 
-variables = {
-    "after": str(timeframe.isoformat())
-}
+Runs the `send_order_reminders` management command in-process instead of
+querying the GraphQL endpoint over HTTP.
+"""
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main(argv=None):
+    sys.path.insert(0, BASE_DIR)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "alx_backend_graphql_crm.settings")
 
-result=client.execute(query, variable_values=variables)
-print(result)
+    import django
+    from django.core.management import call_command
 
-log_path = "/tmp/order_reminders_log.txt"
-timestamp = datetime.now().isoformat()
+    django.setup()
+    call_command("send_order_reminders", *(sys.argv[1:] if argv is None else argv))
 
-with open(log_path, "a") as log_file:
-    for edge in result.get("allOrders", {}).get("edges", []):
-        order = edge.get("node", {})
-        order_id = order.get("id")
-        email = order.get("customer", {}).get("email")
-        log_file.write(f"[{timestamp}] Order ID: {order_id}, Customer Email: {email}\n")
 
-print("Order reminders processed!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
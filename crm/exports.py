@@ -0,0 +1,104 @@
+import csv
+import json
+
+from .filters import (
+    CustomerFilter,
+    ProductFilter,
+    OrderFilter
+)
+from .models import (
+    Customer,
+    Product,
+    Order
+)
+
+# kind -> (model, filterset, {column header: lookup}, ordering)
+EXPORTS = {
+    'orders': (
+        Order,
+        OrderFilter,
+        {
+            'order_id': 'order_id',
+            'order_date': 'order_date',
+            'total_amount': 'total_amount',
+            'customer_id': 'customer_id',
+            'customer_name': 'customer__name',
+            'customer_email': 'customer__email',
+        },
+        ['order_date', 'order_id'],
+    ),
+    'customers': (
+        Customer,
+        CustomerFilter,
+        {name: name for name in ('customer_id', 'name', 'email', 'phone')},
+        ['customer_id'],
+    ),
+    'products': (
+        Product,
+        ProductFilter,
+        {name: name for name in ('product_id', 'name', 'price', 'stock')},
+        ['product_id'],
+    ),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(kind, filters=None):
+    """
+    Return (queryset of value tuples, column names) for an export, selected
+    with the same FilterSet the GraphQL connection uses.
+    """
+    if kind not in EXPORTS:
+        raise ExportError(f"Unknown export '{kind}', expected one of: {', '.join(EXPORTS)}")
+    model, filterset_class, columns, ordering = EXPORTS[kind]
+    filterset = filterset_class(data=filters or {}, queryset=model.objects.all())
+    if not filterset.is_valid():
+        raise ExportError(filterset.errors.as_json())
+    queryset = filterset.qs
+    if not queryset.ordered:
+        queryset = queryset.order_by(*ordering)
+    return queryset.values_list(*columns.values()), list(columns)
+
+
+def csv_rows(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_rows(rows, columns):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), default=str) + '\n'
+
+
+def stream_export(kind, fmt='csv', filters=None, chunk_size=2000, using=None):
+    """
+    Yield the export as text chunks. Rows are read with iterator(), so memory
+    stays flat regardless of the number of rows. `using` picks the database
+    alias (the read replica for the export view).
+    """
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format '{fmt}', expected one of: {', '.join(FORMATS)}")
+    queryset, columns = export_queryset(kind, filters)
+    if using is not None:
+        queryset = queryset.using(using)
+    rows = queryset.iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        return csv_rows(rows, columns)
+    return ndjson_rows(rows, columns)
@@ -0,0 +1,226 @@
+import base64
+import inspect
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from graphene.relay import PageInfo
+from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.utils import maybe_queryset
+from graphql import GraphQLError
+
+from .aio import in_event_loop
+from .loaders import get_loaders
+
+
+class BatchedFilterConnectionField(DjangoFilterConnectionField):
+    """
+    DjangoFilterConnectionField that primes the request loaders with the
+    nodes of the resolved page, so nested relations are fetched in batches.
+    """
+
+    @classmethod
+    def connection_resolver(cls, resolver, connection, default_manager, queryset_resolver,
+                            max_limit, enforce_first_or_last, root, info, **args):
+        result = super().connection_resolver(
+            resolver, connection, default_manager, queryset_resolver,
+            max_limit, enforce_first_or_last, root, info, **args
+        )
+        if inspect.isawaitable(result):
+            return cls.aprime(result, info)
+        cls.prime(result, info)
+        return result
+
+    @staticmethod
+    def prime(result, info):
+        edges = getattr(result, 'edges', None)
+        if edges:
+            get_loaders(info.context).prime(edge.node for edge in edges)
+
+    @classmethod
+    async def aprime(cls, result, info):
+        result = await result
+        cls.prime(result, info)
+        return result
+
+
+class KeysetConnectionField(BatchedFilterConnectionField):
+    """
+    Connection field paginated by sort key instead of OFFSET.
+
+    The opaque cursor encodes the sort-key values of an edge (for example
+    `(order_date, order_id)`, or `(stock, product_id)` when the `orderingBy`
+    filter sorts by stock), so every page is a range scan on the ordering
+    columns. The primary key is always appended as a tie-breaker. No COUNT(*)
+    is issued unless the client selects `totalCount`.
+    """
+
+    def __init__(self, type_, *args, default_ordering=None, **kwargs):
+        self.default_ordering = tuple(default_ordering or ('pk',))
+        super().__init__(type_, *args, **kwargs)
+
+    def get_queryset_resolver(self):
+        resolve_queryset = super().get_queryset_resolver()
+        default_ordering = self.default_ordering
+
+        def resolver(connection, iterable, info, args):
+            queryset = resolve_queryset(connection, iterable, info, args)
+            if isinstance(queryset, QuerySet) and not queryset.ordered:
+                queryset = queryset.order_by(*default_ordering)
+            return queryset
+
+        return resolver
+
+    @staticmethod
+    def get_ordering(queryset):
+        """Return the (field name, descending) pairs the queryset is sorted by."""
+        ordering = []
+        for term in queryset.query.order_by or queryset.model._meta.ordering:
+            if not isinstance(term, str):
+                return None
+            descending = term.startswith('-')
+            name = term.lstrip('-+')
+            if name == 'pk':
+                name = queryset.model._meta.pk.name
+            # Only local columns can be read back off the node for the cursor
+            try:
+                if not queryset.model._meta.get_field(name).concrete:
+                    return None
+            except FieldDoesNotExist:
+                return None
+            ordering.append((name, descending))
+        pk_name = queryset.model._meta.pk.name
+        if pk_name not in [name for name, _ in ordering]:
+            ordering.append((pk_name, ordering[-1][1] if ordering else False))
+        return ordering
+
+    @staticmethod
+    def encode_cursor(instance, ordering):
+        values = [getattr(instance, name) for name, _ in ordering]
+        # isoformat() keeps microseconds, which DjangoJSONEncoder would truncate
+        payload = json.dumps(
+            [v.isoformat() if hasattr(v, 'isoformat') else v for v in values],
+            default=str,
+            separators=(',', ':'),
+        )
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor, model, ordering):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(ordering, values)
+            ]
+        except (ValueError, TypeError, ValidationError, UnicodeError):
+            raise GraphQLError(f"Invalid cursor: {cursor}")
+
+    @staticmethod
+    def seek(ordering, values, forward):
+        """
+        Build the row-value comparison `(k1, k2, ...) > (v1, v2, ...)` as an
+        OR of prefix equalities, honouring the direction of each key.
+        """
+        condition = Q()
+        for i, (name, descending) in enumerate(ordering):
+            lookup = 'gt' if descending != forward else 'lt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for j in range(i):
+                term &= Q(**{ordering[j][0]: values[j]})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def check_page_args(args):
+        # A negative value would reach the ORM as a negative slice
+        for name in ('first', 'last', 'offset'):
+            if (args.get(name) or 0) < 0:
+                raise GraphQLError(f"Argument `{name}` must be a non-negative integer.")
+
+    @classmethod
+    def resolve_connection(cls, connection, args, iterable, max_limit=None):
+        cls.check_page_args(args)
+        iterable = maybe_queryset(iterable)
+        ordering = cls.get_ordering(iterable) if isinstance(iterable, QuerySet) else None
+        if ordering is None:
+            resolve = super().resolve_connection
+            if in_event_loop():
+                return sync_to_async(resolve)(connection, args, iterable, max_limit=max_limit)
+            return resolve(connection, args, iterable, max_limit=max_limit)
+
+        page, window = cls.plan_page(iterable, ordering, args, max_limit)
+        if in_event_loop():
+            return cls.abuild_connection(connection, iterable, ordering, args, page, window)
+        return cls.build_connection(connection, iterable, ordering, args, *window(list(page)))
+
+    @classmethod
+    def plan_page(cls, queryset, ordering, args, max_limit=None):
+        """
+        Return (page queryset, window) for the requested slice; window()
+        turns the fetched rows into (nodes, has_previous, has_next).
+        """
+        model = queryset.model
+        first, last = args.get('first'), args.get('last')
+        after, before = args.get('after'), args.get('before')
+        if first is None and last is None and max_limit is not None:
+            first = max_limit
+
+        page = queryset
+        if after:
+            page = page.filter(cls.seek(ordering, cls.decode_cursor(after, model, ordering), forward=True))
+        if before:
+            page = page.filter(cls.seek(ordering, cls.decode_cursor(before, model, ordering), forward=False))
+        page = page.order_by(*[('-' if desc else '') + name for name, desc in ordering])
+        # The cursor is read off every node, so keep the sort keys out of only()
+        names, defer = page.query.deferred_loading
+        if names and not defer:
+            page = page.only(*names, *[name for name, _ in ordering])
+        offset = args.get('offset') or 0
+
+        if last is not None and first is None:
+            if offset:
+                raise GraphQLError("offset cannot be combined with last")
+
+            def window(nodes):
+                return nodes[:last][::-1], len(nodes) > last, False
+            return page.reverse()[:last + 1], window
+
+        def window(nodes):
+            has_next = has_previous = False
+            if first is not None:
+                has_next = len(nodes) > first
+                nodes = nodes[:first]
+            if last is not None and len(nodes) > last:
+                has_previous = True
+                nodes = nodes[-last:]
+            return nodes, has_previous, has_next
+        return (page[offset:offset + first + 1] if first is not None else page[offset:]), window
+
+    @classmethod
+    async def abuild_connection(cls, connection, queryset, ordering, args, page, window):
+        nodes = [node async for node in page]
+        return cls.build_connection(connection, queryset, ordering, args, *window(nodes))
+
+    @classmethod
+    def build_connection(cls, connection, queryset, ordering, args, nodes, has_previous, has_next):
+        after, before = args.get('after'), args.get('before')
+        edges = [
+            connection.Edge(node=node, cursor=cls.encode_cursor(node, ordering))
+            for node in nodes
+        ]
+        result = connection(
+            edges=edges,
+            page_info=PageInfo(
+                start_cursor=edges[0].cursor if edges else None,
+                end_cursor=edges[-1].cursor if edges else None,
+                has_previous_page=has_previous or bool(after),
+                has_next_page=has_next or bool(before),
+            ),
+        )
+        result.iterable = queryset
+        result.length = None
+        return result
@@ -5,6 +5,7 @@ from .models import (
     Product,
     Order
 )
+from .search import search, search_orders
 
 COUNTRY_CODES = [
     ('+1', 'United States / Canada (+1)'),
@@ -19,6 +20,7 @@ class CustomerFilter(filters.FilterSet):
     """
     name_i_contains=filters.CharFilter(field_name='name', lookup_expr='icontains', label='nameIcontains')
     email_i_contains=filters.CharFilter(field_name='email', lookup_expr='icontains', label='emailIcontains)')
+    search=filters.CharFilter(method='filter_search', label='search', help_text='Full-text search on name and email, best matches first')
 
     phone_country_code = filters.ChoiceFilter(
         field_name='phone',
@@ -39,12 +41,16 @@ class CustomerFilter(filters.FilterSet):
         if value:
             return queryset.filter(phone__startswith=value)
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search(queryset, value)
     
 class ProductFilter(filters.FilterSet):
     """
     Default custom filter for the Product model
     """
     name=filters.CharFilter(lookup_expr='icontains', label='nameIcontains)')
+    search=filters.CharFilter(method='filter_search', label='search', help_text='Full-text search on name and SKU, best matches first')
 
     #Acts on the price field
     price_gte=filters.NumberFilter(field_name='price', lookup_expr='gte', label='priceGte')
@@ -78,6 +84,9 @@ class ProductFilter(filters.FilterSet):
             return queryset.filter(stock__lt=10)
         return queryset 
 
+    def filter_search(self, queryset, name, value):
+        return search(queryset, value)
+
 
 class OrderFilter(filters.FilterSet):
     total_amount_gte=filters.NumberFilter(
@@ -103,9 +112,17 @@ class OrderFilter(filters.FilterSet):
         lookup_expr='icontains',
         label='productName'
         )
+    search=filters.CharFilter(
+        method='filter_search',
+        label='search',
+        help_text='Full-text search on customer and product names'
+    )
 
     class Meta:
         model=Order
         fields = [
         "product__product_id"
-        ]
\ No newline at end of file
+        ]
+
+    def filter_search(self, queryset, name, value):
+        return search_orders(queryset, value)
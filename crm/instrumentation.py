@@ -0,0 +1,323 @@
+import bisect
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from inspect import isawaitable
+
+from django.conf import settings
+
+logger = logging.getLogger('crm.graphql')
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Requests carrying this header get their profile in `extensions.profile`
+    'HEADER': 'X-GraphQL-Profile',
+    'QUERY_COUNT_WARNING': 50,
+    'SLOW_REQUEST_MS': 1000,
+    # Time every resolver of every request (the graphql_resolver_* metrics).
+    # Off, only requests carrying HEADER run through ProfilingMiddleware.
+    'RESOLVERS': False,
+    # Operation names used as metric labels: None for any name, up to
+    # MAX_OPERATIONS of them; other operations are counted as 'anonymous'
+    'OPERATIONS': None,
+    'MAX_OPERATIONS': 100,
+}
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'GRAPHQL_METRICS', {})}
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class ResolverStats:
+    __slots__ = ('calls', 'time', 'sql_count', 'sql_time')
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+
+class RequestProfile:
+    """
+    Timings of one GraphQL operation: phases, SQL and per-resolver-path
+    stats. Installed as a connection execute_wrapper, it attributes every
+    query to the resolver running when it was issued.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.resolvers = defaultdict(ResolverStats)
+        self.fields = defaultdict(ResolverStats)
+        self.operation = None
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.sql_count += 1
+            self.sql_time += elapsed
+            for stats in self._stack[-1:]:
+                for entry in stats:
+                    entry.sql_count += 1
+                    entry.sql_time += elapsed
+
+    def enter(self, path, field):
+        stats = (self.resolvers[path], self.fields[field])
+        self._stack.append(stats)
+        return stats
+
+    def exit(self):
+        self._stack.pop()
+
+    @staticmethod
+    def record(stats, elapsed):
+        for entry in stats:
+            entry.calls += 1
+            entry.time += elapsed
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def n_plus_one_suspects(self):
+        """Resolver paths that issued a query on (almost) every call."""
+        return sorted(
+            path for path, stats in self.resolvers.items()
+            if stats.calls > 1 and stats.sql_count >= stats.calls
+        )
+
+    def as_extension(self):
+        resolvers = sorted(self.resolvers.items(), key=lambda item: -item[1].time)
+        return {
+            'totalMs': _ms(self.total),
+            'phases': {name: _ms(value) for name, value in self.phases.items()},
+            'sql': {'count': self.sql_count, 'timeMs': _ms(self.sql_time)},
+            'resolvers': [
+                {
+                    'path': path,
+                    'calls': stats.calls,
+                    'timeMs': _ms(stats.time),
+                    'sqlCount': stats.sql_count,
+                    'sqlTimeMs': _ms(stats.sql_time),
+                }
+                for path, stats in resolvers
+            ],
+        }
+
+
+def start_profile(request):
+    """Attach a RequestProfile to the request, unless metrics are disabled."""
+    if not metrics_settings()['ENABLED']:
+        return None
+    request._crm_profile = RequestProfile()
+    return request._crm_profile
+
+
+def profile_requested(request):
+    value = request.headers.get(metrics_settings()['HEADER'])
+    return bool(value) and value.lower() not in ('0', 'false', 'no')
+
+
+def profiles_resolvers(request):
+    """Whether ProfilingMiddleware should time the resolvers of `request`."""
+    return metrics_settings()['RESOLVERS'] or profile_requested(request)
+
+
+def get_profile(context):
+    return getattr(context, '_crm_profile', None)
+
+
+def profile_phase(context, name):
+    profile = get_profile(context)
+    return profile.phase(name) if profile is not None else nullcontext()
+
+
+class ProfilingMiddleware:
+    """
+    Graphene middleware timing every resolver of a profiled request, keyed
+    by its response path without list indices (`allOrders.edges.node.customer`).
+    CRMGraphQLView only installs it where profiles_resolvers() allows, as
+    wrapping every field costs time on large lists.
+    """
+
+    def resolve(self, next, root, info, **args):
+        profile = get_profile(info.context)
+        if profile is None:
+            return next(root, info, **args)
+
+        path = '.'.join(str(key) for key in info.path.as_list() if not isinstance(key, int))
+        stats = profile.enter(path, f"{info.parent_type.name}.{info.field_name}")
+        start = time.perf_counter()
+        try:
+            result = next(root, info, **args)
+        except Exception:
+            profile.record(stats, time.perf_counter() - start)
+            raise
+        finally:
+            profile.exit()
+        if isawaitable(result):
+            return self._await(profile, stats, start, result)
+        profile.record(stats, time.perf_counter() - start)
+        return result
+
+    @staticmethod
+    async def _await(profile, stats, start, result):
+        try:
+            return await result
+        finally:
+            # Wall time until the awaited value arrived
+            profile.record(stats, time.perf_counter() - start)
+
+
+class MetricsRegistry:
+    """
+    Process-wide aggregates of the request profiles, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)           # (operation, status) -> count
+            self.durations = {}                        # operation -> [bucket counts, sum, count]
+            self.sql_queries = defaultdict(int)        # operation -> count
+            self.sql_seconds = defaultdict(float)      # operation -> seconds
+            self.resolvers = defaultdict(lambda: [0, 0.0, 0])   # field -> [calls, seconds, sql]
+            self.warnings = defaultdict(int)           # kind -> count
+
+    def _operation_label(self, operation):
+        # Operation names come from clients, so the label set is bounded:
+        # only allowed names, and no new ones once MAX_OPERATIONS are tracked
+        config = metrics_settings()
+        allowed = config['OPERATIONS']
+        if operation is None or (allowed is not None and operation not in allowed):
+            return 'anonymous'
+        if operation not in self.durations and len(self.durations) >= config['MAX_OPERATIONS']:
+            return 'anonymous'
+        return operation
+
+    def observe(self, operation, status, profile):
+        duration = profile.total
+        with self._lock:
+            operation = self._operation_label(operation)
+            self.requests[(operation, status)] += 1
+            histogram = self.durations.setdefault(operation, [[0] * len(DURATION_BUCKETS), 0.0, 0])
+            index = bisect.bisect_left(DURATION_BUCKETS, duration)
+            if index < len(DURATION_BUCKETS):
+                histogram[0][index] += 1
+            histogram[1] += duration
+            histogram[2] += 1
+            self.sql_queries[operation] += profile.sql_count
+            self.sql_seconds[operation] += profile.sql_time
+            for field, stats in profile.fields.items():
+                entry = self.resolvers[field]
+                entry[0] += stats.calls
+                entry[1] += stats.time
+                entry[2] += stats.sql_count
+
+    def warn(self, kind):
+        with self._lock:
+            self.warnings[kind] += 1
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            family('graphql_requests_total', 'counter', 'GraphQL operations executed.')
+            for (operation, status), count in sorted(self.requests.items()):
+                lines.append(f'graphql_requests_total{{operation="{_label(operation)}",status="{status}"}} {count}')
+
+            family('graphql_request_duration_seconds', 'histogram', 'GraphQL operation wall time.')
+            for operation, (buckets, total, count) in sorted(self.durations.items()):
+                label = f'operation="{_label(operation)}"'
+                cumulative = 0
+                for bound, bucket in zip(DURATION_BUCKETS, buckets):
+                    cumulative += bucket
+                    lines.append(f'graphql_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'graphql_request_duration_seconds_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f'graphql_request_duration_seconds_sum{{{label}}} {total:.6f}')
+                lines.append(f'graphql_request_duration_seconds_count{{{label}}} {count}')
+
+            family('graphql_sql_queries_total', 'counter', 'SQL queries issued by GraphQL operations.')
+            for operation, count in sorted(self.sql_queries.items()):
+                lines.append(f'graphql_sql_queries_total{{operation="{_label(operation)}"}} {count}')
+            family('graphql_sql_seconds_total', 'counter', 'Time spent in SQL by GraphQL operations.')
+            for operation, seconds in sorted(self.sql_seconds.items()):
+                lines.append(f'graphql_sql_seconds_total{{operation="{_label(operation)}"}} {seconds:.6f}')
+
+            family('graphql_resolver_calls_total', 'counter', 'Resolver invocations per schema field.')
+            for field, (calls, _, _) in sorted(self.resolvers.items()):
+                lines.append(f'graphql_resolver_calls_total{{field="{field}"}} {calls}')
+            family('graphql_resolver_seconds_total', 'counter', 'Resolver wall time per schema field.')
+            for field, (_, seconds, _) in sorted(self.resolvers.items()):
+                lines.append(f'graphql_resolver_seconds_total{{field="{field}"}} {seconds:.6f}')
+            family('graphql_resolver_sql_queries_total', 'counter', 'SQL queries issued per schema field.')
+            for field, (_, _, sql) in sorted(self.resolvers.items()):
+                lines.append(f'graphql_resolver_sql_queries_total{{field="{field}"}} {sql}')
+
+            family('graphql_warnings_total', 'counter', 'Slow-request and N+1 warnings emitted.')
+            for kind, count in sorted(self.warnings.items()):
+                lines.append(f'graphql_warnings_total{{kind="{kind}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = MetricsRegistry()
+
+
+def report(operation, profile, errors=False):
+    """Record a finished profile in the registry and emit the warnings it trips."""
+    config = metrics_settings()
+    metrics.observe(operation, 'error' if errors else 'ok', profile)
+    operation = operation or 'anonymous'
+
+    if profile.sql_count > config['QUERY_COUNT_WARNING']:
+        metrics.warn('query_count')
+        suspects = profile.n_plus_one_suspects()
+        logger.warning(
+            "GraphQL operation %s issued %d SQL queries (threshold %d)%s",
+            operation,
+            profile.sql_count,
+            config['QUERY_COUNT_WARNING'],
+            f"; possible N+1 in: {', '.join(suspects)}" if suspects else "",
+        )
+    if profile.total * 1000 > config['SLOW_REQUEST_MS']:
+        metrics.warn('slow_request')
+        logger.warning(
+            "Slow GraphQL operation %s: %.0f ms (%d SQL queries, %.0f ms in SQL)",
+            operation, profile.total * 1000, profile.sql_count, profile.sql_time * 1000,
+        )
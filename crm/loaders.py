@@ -0,0 +1,143 @@
+from collections import defaultdict
+
+from .models import (
+    Customer,
+    Product,
+    Order,
+    OrderLine
+)
+
+
+def prefetched(instance, name):
+    """
+    Return the related objects already loaded by prefetch_related, or None.
+    """
+    cache = getattr(instance, '_prefetched_objects_cache', {})
+    if name in cache:
+        return list(cache[name])
+    return None
+
+
+class BatchLoader:
+    """
+    Synchronous DataLoader: keys are queued as parent objects are resolved
+    and the first load() fetches every queued key with one query.
+    """
+
+    def __init__(self, batch_load_fn, default=None):
+        self.batch_load_fn = batch_load_fn
+        self.default = default
+        self._cache = {}
+        self._queue = set()
+
+    def prime(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+
+    def load(self, key):
+        if key not in self._cache:
+            self._queue.add(key)
+            self.dispatch()
+        return self._cache[key]
+
+    def dispatch(self):
+        keys = list(self._queue)
+        self._queue.clear()
+        if not keys:
+            return
+        results = self.batch_load_fn(keys)
+        for key in keys:
+            value = results.get(key)
+            if value is None and self.default is not None:
+                value = self.default()
+            self._cache[key] = value
+
+
+class CRMLoaders:
+    """
+    Per-request registry of the loaders used by the CRM object types.
+    Everything a loader returns is primed into the loaders of the next
+    nesting level, so each level of a query costs one batched query.
+    """
+
+    def __init__(self):
+        self.customer_by_id = BatchLoader(self._load_customers)
+        self.products_by_order = BatchLoader(self._load_products_by_order, default=list)
+        self.lines_by_order = BatchLoader(self._load_lines_by_order, default=list)
+        self.orders_by_customer = BatchLoader(self._load_orders_by_customer, default=list)
+        self.orders_by_product = BatchLoader(self._load_orders_by_product, default=list)
+
+    def prime(self, instances):
+        for instance in instances:
+            if isinstance(instance, Order):
+                # A deferred customer_id means the customer was not selected
+                if not Order.customer.is_cached(instance) and 'customer_id' not in instance.get_deferred_fields():
+                    self.customer_by_id.prime(instance.customer_id)
+                if prefetched(instance, 'product') is None:
+                    self.products_by_order.prime(instance.pk)
+                if prefetched(instance, 'lines') is None:
+                    self.lines_by_order.prime(instance.pk)
+            elif isinstance(instance, Customer):
+                if prefetched(instance, 'purchases') is None:
+                    self.orders_by_customer.prime(instance.pk)
+            elif isinstance(instance, Product):
+                if prefetched(instance, 'dispatched_orders') is None:
+                    self.orders_by_product.prime(instance.pk)
+
+    def _load_customers(self, keys):
+        customers = Customer.objects.in_bulk(keys)
+        self.prime(customers.values())
+        return customers
+
+    def _load_products_by_order(self, keys):
+        grouped = defaultdict(list)
+        rows = (
+            Order.product.through.objects
+            .filter(order_id__in=keys)
+            .select_related('product')
+            .order_by('id')
+        )
+        for row in rows:
+            grouped[row.order_id].append(row.product)
+        self.prime(p for products in grouped.values() for p in products)
+        return grouped
+
+    def _load_lines_by_order(self, keys):
+        grouped = defaultdict(list)
+        for line in OrderLine.objects.filter(order_id__in=keys).select_related('product').order_by('id'):
+            grouped[line.order_id].append(line)
+        self.prime(line.product for lines in grouped.values() for line in lines)
+        return grouped
+
+    def _load_orders_by_customer(self, keys):
+        grouped = defaultdict(list)
+        for order in Order.objects.filter(customer_id__in=keys).order_by('order_date', 'pk'):
+            grouped[order.customer_id].append(order)
+        self.prime(o for orders in grouped.values() for o in orders)
+        return grouped
+
+    def _load_orders_by_product(self, keys):
+        grouped = defaultdict(list)
+        rows = (
+            Order.product.through.objects
+            .filter(product_id__in=keys)
+            .select_related('order')
+            .order_by('id')
+        )
+        for row in rows:
+            grouped[row.product_id].append(row.order)
+        self.prime(o for orders in grouped.values() for o in orders)
+        return grouped
+
+
+def get_loaders(context):
+    """
+    Return the loaders attached to the request context, creating them on first use.
+    """
+    if context is None:
+        return CRMLoaders()
+    loaders = getattr(context, '_crm_loaders', None)
+    if loaders is None:
+        loaders = CRMLoaders()
+        context._crm_loaders = loaders
+    return loaders
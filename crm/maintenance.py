@@ -0,0 +1,194 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncDate
+
+from .cache import response_cache
+from .models import (
+    Customer,
+    Product,
+    Order,
+    OrderLine
+)
+from .search import remove_objects
+from .signals import muted_receivers
+from .subscriptions import publish_stock_changed
+
+LOW_STOCK_LOG_PATH = '/tmp/low_stock_updates_log.txt'
+
+
+def _range(queryset, first, last):
+    return queryset.filter(pk__gte=first, pk__lte=last)
+
+
+# Restock
+
+def restock_range(first, last, threshold=10, amount=10):
+    """
+    Add `amount` to every product in the PK range whose stock is below
+    `threshold`. Returns the updated products as [name, new stock] pairs.
+    """
+    with transaction.atomic():
+        pks = list(
+            _range(Product.objects.filter(stock__lt=threshold), first, last)
+            .select_for_update()
+            .values_list('pk', flat=True)
+        )
+        if not pks:
+            return {'updated_count': 0, 'products': []}
+        Product.objects.filter(pk__in=pks).update(stock=F('stock') + amount)
+        products = list(Product.objects.filter(pk__in=pks).order_by('name').values_list('name', 'stock'))
+        response_cache.invalidate(Product)
+        publish_stock_changed(pks)
+    return {'updated_count': len(pks), 'products': [list(row) for row in products]}
+
+
+def merge_restock(parts):
+    return {
+        'updated_count': sum(part['updated_count'] for part in parts),
+        'products': [product for part in parts for product in part['products']],
+    }
+
+
+def log_restock(result, log_path=LOW_STOCK_LOG_PATH):
+    if not result['updated_count']:
+        return
+    timestamp = datetime.now().isoformat()
+    with open(log_path, "a") as log_file:
+        log_file.write("".join(
+            f"[{timestamp}] Updated {name} stock to {stock}\n" for name, stock in result['products']
+        ))
+
+
+# Customer cleanup
+
+def inactive_customers(queryset, cutoff):
+    """Customers whose most recent order is older than `cutoff`."""
+    return queryset.annotate(
+        last_order_date=Max('purchases__order_date')
+    ).filter(last_order_date__lt=cutoff)
+
+
+def delete_inactive_customers(pks, cutoff):
+    """
+    Delete the customers in `pks` that are still inactive, with their orders,
+    in one short transaction. Returns the number of customers deleted.
+
+    The per-row delete receivers are muted: the search index entries are
+    removed with one statement and the response cache invalidated once.
+    """
+    with transaction.atomic(), muted_receivers():
+        # Re-check inside the transaction: a customer may have ordered since.
+        # exclude() compiles to NOT EXISTS, so the rows can be locked
+        # (FOR UPDATE is not allowed together with the GROUP BY of Max()).
+        pks = list(
+            Customer.objects.filter(pk__in=pks)
+            .exclude(purchases__order_date__gte=cutoff)
+            .select_for_update()
+            .values_list('pk', flat=True)
+        )
+        if not pks:
+            return 0
+        # Order.customer is DO_NOTHING, so the orders have to go first
+        OrderLine.objects.filter(order__customer_id__in=pks).delete()
+        Order.objects.filter(customer_id__in=pks).delete()
+        Customer.objects.filter(pk__in=pks).delete()
+        remove_objects(Customer, pks)
+        response_cache.invalidate(Customer, Order)
+    return len(pks)
+
+
+def cleanup_range(first, last, cutoff, dry_run=False):
+    """Delete (or with `dry_run`, count) the inactive customers in the PK range."""
+    if isinstance(cutoff, str):
+        cutoff = datetime.fromisoformat(cutoff)
+    pks = list(inactive_customers(_range(Customer.objects.all(), first, last), cutoff).values_list('pk', flat=True))
+    if dry_run or not pks:
+        return len(pks)
+    return delete_inactive_customers(pks, cutoff)
+
+
+# Reporting
+
+def report_range(first, last, since, until):
+    """
+    Partial CRM report over the orders in the PK range, with Decimals as
+    strings. Combine the partials with merge_report().
+    """
+    since, until = datetime.fromisoformat(since), datetime.fromisoformat(until)
+    orders = _range(Order.objects.all(), first, last)
+    period_orders = orders.filter(order_date__gte=since, order_date__lt=until)
+
+    totals = orders.aggregate(orders=Count('pk'), revenue=Sum('total_amount'))
+    period = period_orders.aggregate(orders=Count('pk'), revenue=Sum('total_amount'))
+    per_day = (
+        period_orders
+        .annotate(day=TruncDate('order_date'))
+        .values('day')
+        .annotate(orders=Count('pk'), revenue=Sum('total_amount'))
+        .order_by()
+    )
+    per_product = (
+        OrderLine.objects
+        .filter(order_id__gte=first, order_id__lte=last)
+        .filter(order__order_date__gte=since, order__order_date__lt=until)
+        .values('product_id', 'product__name')
+        .annotate(orders=Count('order_id'), revenue=Sum('line_total'))
+        .order_by()
+    )
+    return {
+        'totals': [totals['orders'], str(totals['revenue'] or 0)],
+        'period_totals': [period['orders'], str(period['revenue'] or 0)],
+        'per_day': {row['day'].isoformat(): [row['orders'], str(row['revenue'] or 0)] for row in per_day},
+        'per_product': {
+            str(row['product_id']): [row['product__name'], row['orders'], str(row['revenue'] or 0)]
+            for row in per_product
+        },
+    }
+
+
+def merge_report(parts, since, until, period_days, top_products=20):
+    """Reduce report_range() partials into the structure written by write_crm_report()."""
+    orders, revenue = 0, Decimal('0')
+    period_count, period_revenue = 0, Decimal('0')
+    per_day = defaultdict(lambda: [0, Decimal('0')])
+    per_product = {}
+
+    for part in parts:
+        orders += part['totals'][0]
+        revenue += Decimal(part['totals'][1])
+        period_count += part['period_totals'][0]
+        period_revenue += Decimal(part['period_totals'][1])
+        for day, (count, amount) in part['per_day'].items():
+            per_day[day][0] += count
+            per_day[day][1] += Decimal(amount)
+        for product_id, (name, count, amount) in part['per_product'].items():
+            row = per_product.setdefault(product_id, [name, 0, Decimal('0')])
+            row[1] += count
+            row[2] += Decimal(amount)
+
+    ranked = sorted(per_product.items(), key=lambda item: (-item[1][2], item[0]))[:top_products]
+    return {
+        'generated_at': until,
+        'period': {'start': since, 'end': until, 'days': period_days},
+        'totals': {
+            'customers': Customer.objects.count(),
+            'orders': orders,
+            'revenue': str(revenue),
+        },
+        'period_totals': {
+            'orders': period_count,
+            'revenue': str(period_revenue),
+        },
+        'per_day': [
+            {'day': day, 'orders': count, 'revenue': str(amount)}
+            for day, (count, amount) in sorted(per_day.items())
+        ],
+        'per_product': [
+            {'product_id': product_id, 'name': name, 'orders': count, 'revenue': str(amount)}
+            for product_id, (name, count, amount) in ranked
+        ],
+    }
@@ -0,0 +1,156 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from crm.benchmarks.data import benchmark_database
+from crm.filters import CustomerFilter, OrderFilter, ProductFilter
+from crm.models import Customer, Order, OrderLine, Product
+from crm.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a dataset in a throwaway test database and print the query plan "
+        "and timing of the FilterSet lookups with and without the crm indexes. "
+        "The configured database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=2000)
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with benchmark_database():
+            self.seed(options['customers'], options['products'], options['orders'])
+            self.analyze()
+
+            after = {label: self.measure(qs, options['repeat']) for label, qs in self.scenarios()}
+            self.drop_indexes()
+            self.analyze()
+            before = {label: self.measure(qs, options['repeat']) for label, qs in self.scenarios()}
+
+        for label, _ in self.scenarios():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {label}"))
+            for name, results in (('before', before), ('after', after)):
+                plan, elapsed = results[label]
+                self.stdout.write(f"  {name}: {elapsed:.2f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+    def seed(self, customers, products, orders):
+        now = timezone.now()
+        customer_rows = [
+            Customer(
+                name=f"Customer {i}",
+                email=f"bench-{uuid.uuid4().hex}@example.com",
+                phone=random.choice(['+1', '+234', '+254', '+255']) + str(random.randint(10**8, 10**9)),
+            )
+            for i in range(customers)
+        ]
+        Customer.objects.bulk_create(customer_rows, batch_size=1000)
+        product_rows = [
+            Product(
+                name=f"Product {i}",
+                price=Decimal(random.randint(100, 100000)) / 100,
+                stock=random.randint(0, 200),
+            )
+            for i in range(products)
+        ]
+        Product.objects.bulk_create(product_rows, batch_size=1000)
+
+        order_rows = [
+            Order(
+                customer=random.choice(customer_rows),
+                total_amount=Decimal(random.randint(100, 500000)) / 100,
+            )
+            for _ in range(orders)
+        ]
+        Order.objects.bulk_create(order_rows, batch_size=1000)
+        OrderLine.objects.bulk_create(
+            [
+                OrderLine(order_id=order.pk, product_id=product.pk, unit_price=product.price, line_total=product.price)
+                for order in order_rows
+                for product in random.sample(product_rows, k=min(3, len(product_rows)))
+            ],
+            batch_size=1000,
+        )
+
+        # order_date is auto_now_add, so spread it over a year afterwards
+        by_day = {}
+        for order in order_rows:
+            by_day.setdefault(random.randint(0, 364), []).append(order.pk)
+        for day, pks in by_day.items():
+            for start in range(0, len(pks), 500):
+                Order.objects.filter(pk__in=pks[start:start + 500]).update(
+                    order_date=now - timedelta(days=day, minutes=random.randint(0, 1439))
+                )
+        rebuild_index()
+
+    def scenarios(self):
+        now = timezone.now()
+        return [
+            ("orders: orderDate range (last 7 days)", OrderFilter(
+                data={'order_date_after': now - timedelta(days=7), 'order_date_before': now},
+                queryset=Order.objects.all(),
+            ).qs),
+            ("orders: totalAmountGte", OrderFilter(
+                data={'total_amount_gte': 4900}, queryset=Order.objects.all()
+            ).qs),
+            ("orders: keyset page by (order_date, order_id)",
+             Order.objects.filter(order_date__gt=now - timedelta(days=180)).order_by('order_date', 'order_id')),
+            ("products: priceGte/priceLte", ProductFilter(
+                data={'price_gte': 10, 'price_lte': 20}, queryset=Product.objects.all()
+            ).qs),
+            ("products: lowStock", ProductFilter(
+                data={'low_stock': True}, queryset=Product.objects.all()
+            ).qs),
+            ("products: stockLte ordered by stock", ProductFilter(
+                data={'stock_lte': 5, 'ordering_by': 'stock'}, queryset=Product.objects.all()
+            ).qs),
+            ("customers: phoneCountryCode", CustomerFilter(
+                data={'phone_country_code': '+254'}, queryset=Customer.objects.all()
+            ).qs),
+            ("customers: nameIcontains", CustomerFilter(
+                data={'name_i_contains': 'customer 1234'}, queryset=Customer.objects.all()
+            ).qs),
+            ("customers: search", CustomerFilter(
+                data={'search': 'customer 1234'}, queryset=Customer.objects.all()
+            ).qs),
+            ("orders: customerName", OrderFilter(
+                data={'customer_name': 'customer 1234'}, queryset=Order.objects.all()
+            ).qs),
+            ("orders: search", OrderFilter(
+                data={'search': 'customer 1234'}, queryset=Order.objects.all()
+            ).qs),
+        ]
+
+    def measure(self, queryset, repeat):
+        page = queryset[:100]
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(page.all())
+            timings.append((time.perf_counter() - start) * 1000)
+        return page.explain(), statistics.median(timings)
+
+    def drop_indexes(self):
+        # The whole database is dropped afterwards, so nothing restores these
+        with connection.cursor() as cursor:
+            for model in (Customer, Product, Order):
+                for index in model._meta.indexes:
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
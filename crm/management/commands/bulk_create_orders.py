@@ -0,0 +1,91 @@
+import json
+import sys
+import time
+from collections import deque
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.orders import order_items, place_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Create orders from an NDJSON file, one "
+        '{"customerId": ..., "productIds": [...]} or '
+        '{"customerId": ..., "lines": [{"productId": ..., "quantity": ...}]} '
+        "object per line, in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file to read, or - for stdin")
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument(
+            '--no-reserve-stock',
+            dest='reserve_stock',
+            action='store_false',
+            help="Leave product stock untouched (orders already fulfilled upstream)"
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+
+        try:
+            source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+
+        # File line number of every row handed to place_orders() and not yet
+        # answered; it never holds more than one chunk
+        line_numbers = deque()
+        created = failed = 0
+        start = time.perf_counter()
+
+        def rows():
+            nonlocal failed
+            for number, text in enumerate(source, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    data = json.loads(text)
+                    items = order_items(
+                        data.get('productIds'),
+                        [(line.get('productId'), line.get('quantity', 1)) for line in data.get('lines') or []],
+                    )
+                except (ValueError, AttributeError, TypeError) as e:
+                    failed += 1
+                    self.stderr.write(f"Line {number}: {e}")
+                    continue
+                line_numbers.append(number)
+                yield data.get('customerId'), items
+
+        with source:
+            for result in place_orders(rows(), chunk_size=chunk_size, reserve=options['reserve_stock']):
+                number = line_numbers.popleft()
+                if result.ok:
+                    created += 1
+                else:
+                    failed += 1
+                    for message in self.describe(result):
+                        self.stderr.write(f"Line {number}: {message}")
+                if (result.row + 1) % chunk_size == 0:
+                    self.progress(created, failed, start)
+
+        self.progress(created, failed, start)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} order(s); {failed} row(s) rejected."))
+
+    @staticmethod
+    def describe(result):
+        if result.message:
+            yield result.message
+        for error in result.errors:
+            detail = f"{error.message} for product {error.product_id} (line item {error.line + 1}"
+            if error.available is not None:
+                detail += f", requested {error.requested}, available {error.available}"
+            yield detail + ")"
+
+    def progress(self, created, failed, start):
+        elapsed = time.perf_counter() - start
+        rate = (created + failed) / elapsed if elapsed else 0
+        self.stderr.write(f"{created} created, {failed} rejected ({rate:.0f} rows/s, {elapsed:.1f}s elapsed)")
@@ -1,26 +1,85 @@
-from django.utils import timezone
+import time
 from datetime import timedelta
-from django.core.management.base import BaseCommand
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from crm.chunks import fan_out
+from crm.maintenance import delete_inactive_customers, inactive_customers
 from crm.models import Customer
+from crm.tasks import cleanup_chunk, sum_results
+
 
 class Command(BaseCommand):
-    help = "Delete customers who are marked as inactive (is_active=False)"
+    help = (
+        "Delete customers whose most recent order is older than the cutoff, "
+        "together with those orders, in small batches"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help="Inactivity window in days")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the customers that would be deleted")
+        parser.add_argument(
+            '--parallel',
+            action='store_true',
+            help="Fan the PK-range chunks out to the Celery workers and wait for the total"
+        )
 
     def handle(self, *args, **options):
-        
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be a positive integer")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if options['parallel']:
+            deleted = fan_out(
+                cleanup_chunk,
+                Customer.objects.all(),
+                sum_results.s(),
+                chunk_size=batch_size,
+                cutoff=cutoff.isoformat(),
+                dry_run=dry_run,
+            ).get()
+            self.stdout.write(str(deleted))
+            return
 
-        cutoff_date = timezone.now() - timedelta(days=365)
-        # Count how many we are about to delete
-        to_delete = Customer.objects.filter(purchases__order_date__lte=cutoff_date)
-        count = to_delete.count()
+        start = time.perf_counter()
+        deleted = 0
+        for batch in self.inactive_batches(cutoff, batch_size):
+            if dry_run:
+                deleted += len(batch)
+            else:
+                deleted += delete_inactive_customers(batch, cutoff)
+            elapsed = time.perf_counter() - start
+            rate = deleted / elapsed if elapsed else 0
+            self.stderr.write(
+                f"{'Found' if dry_run else 'Deleted'} {deleted} customer(s) "
+                f"({rate:.0f}/s, {elapsed:.1f}s elapsed)"
+            )
 
-        # Actually delete them
-        deleted_count, _ = to_delete.delete()
+        # Print ONLY the number on stdout (this is what the bash script captures)
+        self.stdout.write(str(deleted))
 
-        # Print ONLY the number (this is what your bash script captures)
-        print(deleted_count)
+        verb = "Would delete" if dry_run else "Successfully deleted"
+        self.stderr.write(self.style.SUCCESS(f"{verb} {deleted} inactive customer(s)."))
 
-        # Optional: also write a nice message to stderr so it doesn't interfere with the number
-        self.stdout.write(
-            self.style.SUCCESS(f"Successfully deleted {deleted_count} inactive customer(s).")
-        )
\ No newline at end of file
+    def inactive_batches(self, cutoff, batch_size):
+        """
+        Yield lists of inactive customer PKs, walking the primary key so each
+        batch is a short, independent query rather than one long cursor.
+        """
+        last_pk = None
+        while True:
+            queryset = Customer.objects.order_by('pk')
+            if last_pk is not None:
+                queryset = queryset.filter(pk__gt=last_pk)
+            batch = list(
+                inactive_customers(queryset, cutoff).values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                return
+            yield batch
+            last_pk = batch[-1]
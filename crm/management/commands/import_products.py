@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.catalog import FORMATS, read_rows, upsert_products
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update products from a CSV (sku,name,price,stock header) or "
+        "NDJSON catalog feed, matched by SKU, in chunks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Feed file to read, or - for stdin")
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default=None,
+            help="Feed format; defaults to the file extension (.csv or .ndjson/.jsonl)"
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+
+        format = options['format']
+        if format is None:
+            extension = os.path.splitext(path)[1].lower()
+            format = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson'}.get(extension)
+            if format is None:
+                raise CommandError("Cannot tell the feed format from the file name; pass --format")
+
+        try:
+            source = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        rows = created = updated = rejected = 0
+        start = time.perf_counter()
+        with source:
+            for result in upsert_products(read_rows(source, format), chunk_size=chunk_size):
+                rows += result.rows
+                created += result.created
+                updated += result.updated
+                rejected += len(result.errors)
+                for _, message in result.errors:
+                    self.stderr.write(message)
+                elapsed = time.perf_counter() - start
+                rate = rows / elapsed if elapsed else 0
+                self.stderr.write(
+                    f"{rows} row(s): {created} created, {updated} updated, {rejected} rejected "
+                    f"({rate:.0f} rows/s, {elapsed:.1f}s elapsed)"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {rows} row(s): {created} created, {updated} updated, {rejected} rejected."
+        ))
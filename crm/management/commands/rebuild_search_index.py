@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from crm.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-create the full-text search index of customers and products from their tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = rebuild_index(batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        if not counts:
+            self.stdout.write("This database has no full-text index; searches fall back to icontains.")
+            return
+        summary = ', '.join(f"{count} {model._meta.verbose_name}(s)" for model, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the search index in {elapsed:.2f}s: {summary}."))
@@ -0,0 +1,64 @@
+import json
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.benchmarks.data import SCALES, benchmark_database, generate, is_seeded
+from crm.benchmarks.runner import format_table, run_scenarios
+from crm.benchmarks.scenarios import SCENARIOS, get_scenarios
+from crm.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a deterministic dataset in a throwaway test database and replay "
+        "the GraphQL benchmark scenarios, reporting throughput, p50/p99 "
+        "latency and SQL queries per operation"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=list(SCALES), default='1k')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=list(SCENARIOS),
+            help="Scenario to run (repeatable; all by default)"
+        )
+        parser.add_argument('--path', default='/graphql/', help="GraphQL endpoint to exercise")
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help="Keep the benchmark database, and reuse it when seeded with the same --scale and --seed"
+        )
+        parser.add_argument('--json', dest='json_path', help="Also write the summaries to this JSON file")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be a positive integer")
+
+        with benchmark_database(keepdb=options['keepdb']):
+            if is_seeded(options['scale'], options['seed']):
+                self.stderr.write("Reusing the seeded benchmark database")
+            else:
+                if Customer.objects.exists():
+                    # Kept from a run with another --scale or --seed
+                    self.stderr.write("Reseeding the benchmark database")
+                    call_command('flush', interactive=False, verbosity=0)
+                generate(options['scale'], seed=options['seed'], stdout=self.stderr)
+
+            scenarios = get_scenarios(options['scenario'], seed=options['seed'])
+            results = run_scenarios(
+                scenarios,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                path=options['path'],
+            )
+
+        summaries = [result.summary() for result in results]
+        self.stdout.write(format_table(summaries))
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'scale': options['scale'], 'seed': options['seed'], 'results': summaries}, f, indent=2)
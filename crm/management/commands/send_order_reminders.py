@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.reminders import reminder_settings, send_order_reminders
+
+
+class Command(BaseCommand):
+    help = "Send one reminder per customer with orders in the last N days"
+
+    def add_arguments(self, parser):
+        config = reminder_settings()
+        parser.add_argument('--days', type=int, default=config['DAYS'], help="Look-back window in days")
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'])
+        parser.add_argument(
+            '--backend',
+            default=None,
+            help="Dotted path of the sender backend, e.g. crm.reminders.ConsoleReminderBackend"
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be a positive integer")
+
+        start = time.perf_counter()
+        try:
+            sent, orders = send_order_reminders(
+                days=options['days'],
+                batch_size=options['batch_size'],
+                backend=options['backend'],
+            )
+        except ImportError as e:
+            raise CommandError(f"Invalid reminder backend: {e}")
+
+        elapsed = time.perf_counter() - start
+        self.stderr.write(self.style.SUCCESS(
+            f"Order reminders processed! {sent} customer(s), {orders} order(s) in {elapsed:.2f}s."
+        ))
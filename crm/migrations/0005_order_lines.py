@@ -0,0 +1,73 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def snapshot_prices(apps, schema_editor):
+    """Existing lines are one unit each at the product's current price."""
+    OrderLine = apps.get_model('crm', 'OrderLine')
+    Product = apps.get_model('crm', 'Product')
+    price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    OrderLine.objects.update(unit_price=price)
+    OrderLine.objects.update(line_total=F('unit_price') * F('quantity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_sales_rollups'),
+    ]
+
+    operations = [
+        # Order.product becomes a M2M through OrderLine. The auto-created
+        # table already has the id/order_id/product_id columns, so it is
+        # renamed and kept instead of being copied.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql='ALTER TABLE crm_order_product RENAME TO crm_orderline',
+                    reverse_sql='ALTER TABLE crm_orderline RENAME TO crm_order_product',
+                ),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name='OrderLine',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='crm.order')),
+                        ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_lines', to='crm.product')),
+                    ],
+                    options={
+                        'unique_together': {('order', 'product')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='order',
+                    name='product',
+                    field=models.ManyToManyField(related_name='dispatched_orders', through='crm.OrderLine', to='crm.product'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderline',
+            name='quantity',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='orderline',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderline',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+            preserve_default=False,
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='orderline',
+            constraint=models.CheckConstraint(condition=models.Q(('quantity__gte', 1)), name='crm_orderline_quantity_positive'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from django.db import migrations
+
+
+# Full-text side tables for crm.search, one row per indexed row and found by
+# the model's primary key. On SQLite the table holds the text and triggers
+# feed an external-content FTS5 table, so the key is never tokenized; on
+# PostgreSQL it holds a tsvector document under a GIN index. Other databases
+# keep using icontains scans.
+SEARCH_INDEXES = [
+    ('crm_customer_search', 'crm_customer', 'customer_id', ['name', 'email']),
+    ('crm_product_search', 'crm_product', 'product_id', ['name', 'sku']),
+]
+
+
+def document(columns):
+    columns = ', '.join(
+        f"regexp_replace(coalesce({column}, ''), '[^[:alnum:]]+', ' ', 'g')" for column in columns
+    )
+    return f"to_tsvector('simple', concat_ws(' ', {columns}))"
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, source, key, columns in SEARCH_INDEXES:
+        if vendor == 'sqlite':
+            fts = f'{table}_fts'
+            names = ', '.join(columns)
+            new = ', '.join(f'new.{column}' for column in columns)
+            old = ', '.join(f'old.{column}' for column in columns)
+            schema_editor.execute(
+                f'CREATE TABLE {table} (id integer PRIMARY KEY, {key} char(32) NOT NULL UNIQUE, '
+                + ', '.join(f'{column} text' for column in columns) + ')'
+            )
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content = '{table}', content_rowid = 'id', "
+                f"tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_ai AFTER INSERT ON {table} BEGIN '
+                f'INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new}); END'
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_ad AFTER DELETE ON {table} BEGIN '
+                f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); END"
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {table}_au AFTER UPDATE ON {table} BEGIN '
+                f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old}); "
+                f'INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new}); END'
+            )
+            schema_editor.execute(
+                f'INSERT INTO {table} ({key}, {names}) SELECT {key}, {names} FROM {source}'
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute(
+                f'CREATE TABLE {table} ('
+                f'{key} uuid PRIMARY KEY REFERENCES {source} ({key}) ON DELETE CASCADE, '
+                f'document tsvector NOT NULL)'
+            )
+            schema_editor.execute(f'CREATE INDEX {table}_document_idx ON {table} USING gin (document)')
+            schema_editor.execute(
+                f'INSERT INTO {table} ({key}, document) SELECT {key}, {document(columns)} FROM {source}'
+            )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    for table, _, _, _ in SEARCH_INDEXES:
+        if schema_editor.connection.vendor == 'sqlite':
+            schema_editor.execute(f'DROP TABLE IF EXISTS {table}_fts')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0006_product_sku'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.db.models import Q
 
 
 # Create your models here.
@@ -7,8 +8,7 @@ class Customer(models.Model):
     customer_id = models.UUIDField(
         primary_key=True,
         default=uuid.uuid4,
-        editable=False,
-        db_index=True
+        editable=False
     )
 
     name = models.CharField(
@@ -25,6 +25,17 @@ class Customer(models.Model):
         blank=True
     )
 
+    class Meta:
+        indexes = [
+            # CustomerFilter.filter_phone uses phone__startswith (LIKE 'x%');
+            # the pattern opclass lets PostgreSQL serve it from the index
+            models.Index(
+                fields=['phone'],
+                name='crm_customer_phone_idx',
+                opclasses=['varchar_pattern_ops']
+            ),
+        ]
+
     def __str__(self):
         return f'{self.name}'
 
@@ -32,14 +43,21 @@ class Product(models.Model):
     product_id= models.UUIDField(
         primary_key=True,
         default= uuid.uuid4,
-        editable=False,
-        db_index=True
+        editable=False
     )
 
     name= models.CharField(
         max_length=100,
         blank=False
     )
+
+    # Natural key of the catalog feed; products created through the API may have none
+    sku= models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True
+    )
     
     price= models.DecimalField(
         max_digits=10,
@@ -50,6 +68,19 @@ class Product(models.Model):
         default=0
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['price'], name='crm_product_price_idx'),
+            # stock range filters and the (stock, product_id) keyset cursor
+            models.Index(fields=['stock', 'product_id'], name='crm_product_stock_idx'),
+            # ProductFilter.low_stock and UpdateLowStockProducts
+            models.Index(
+                fields=['stock'],
+                name='crm_product_low_stock_idx',
+                condition=Q(stock__lt=10)
+            ),
+        ]
+
     def __str__(self):
         return f'{self.name}'
 
@@ -57,8 +88,7 @@ class Order(models.Model):
     order_id= models.UUIDField(
         primary_key=True,
         default= uuid.uuid4,
-        editable=False,
-        db_index=True
+        editable=False
     )
 
     customer= models.ForeignKey(
@@ -69,16 +99,102 @@ class Order(models.Model):
 
     product= models.ManyToManyField(
         Product,
+        through='OrderLine',
         related_name= 'dispatched_orders'
     )
     order_date = models.DateTimeField(auto_now_add=True)
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0.00)
 
+    class Meta:
+        indexes = [
+            # order_date ranges and the (order_date, order_id) keyset cursor
+            models.Index(fields=['order_date', 'order_id'], name='crm_order_date_idx'),
+            models.Index(fields=['total_amount'], name='crm_order_total_idx'),
+            # A customer's latest order (customer cleanup, purchases)
+            models.Index(fields=['customer', 'order_date'], name='crm_order_customer_date_idx'),
+        ]
+
     def __str__(self):
         return f'{self.order_id}'
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.product.exists():
-            self.total_amount = sum(p.price for p in self.products.all())
-            super().save(update_fields=['total_amount'])
\ No newline at end of file
+class OrderLine(models.Model):
+    """
+    One product of an order. The price is snapshotted when the order is
+    placed, so later price changes leave the order's totals untouched.
+    """
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='lines'
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='order_lines'
+    )
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        # The table started out as the auto-created Order.product M2M table
+        unique_together = [('order', 'product')]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(quantity__gte=1),
+                name='crm_orderline_quantity_positive'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.order_id}: {self.quantity} x {self.product_id}'
+
+class DailySalesRollup(models.Model):
+    """Orders and revenue per calendar day, maintained incrementally by crm.rollups"""
+    day = models.DateField(primary_key=True)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f'{self.day}'
+
+
+class CustomerSalesRollup(models.Model):
+    """Lifetime orders and revenue per customer"""
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sales_rollup'
+    )
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_order_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-revenue'], name='crm_customer_rollup_rev_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.customer_id}'
+
+
+class ProductSalesRollup(models.Model):
+    """Lifetime order lines and revenue per product"""
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sales_rollup'
+    )
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-revenue'], name='crm_product_rollup_rev_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.product_id}'
@@ -0,0 +1,146 @@
+from django.db.models import Prefetch
+from graphene.utils.str_converters import to_snake_case
+from graphql.language import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+CONNECTION_FIELDS = {'edges', 'pageInfo', 'totalCount'}
+
+
+def _selected_fields(selection_set, info):
+    """
+    Flatten a selection set into {field name: [FieldNode, ...]}, expanding
+    fragment spreads and inline fragments.
+    """
+    fields = {}
+    if selection_set is None:
+        return fields
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            fields.setdefault(selection.name.value, []).append(selection)
+        elif isinstance(selection, InlineFragmentNode):
+            for name, nodes in _selected_fields(selection.selection_set, info).items():
+                fields.setdefault(name, []).extend(nodes)
+        elif isinstance(selection, FragmentSpreadNode):
+            fragment = info.fragments.get(selection.name.value)
+            if fragment is not None:
+                for name, nodes in _selected_fields(fragment.selection_set, info).items():
+                    fields.setdefault(name, []).extend(nodes)
+    return fields
+
+
+def _merge_children(nodes, info):
+    merged = {}
+    for node in nodes:
+        for name, children in _selected_fields(node.selection_set, info).items():
+            merged.setdefault(name, []).extend(children)
+    return merged
+
+
+def _connection_nodes(nodes, info):
+    """
+    Return the selections made on `edges { node { ... } }` of a connection.
+    """
+    edges = _merge_children(nodes, info).get('edges', [])
+    return _merge_children(edges, info).get('node', [])
+
+
+def _list_nodes(nodes, info):
+    """
+    Return the selections made on the items of a related field: the nodes
+    of a connection, or the field itself for a plain list.
+    """
+    children = _merge_children(nodes, info)
+    if CONNECTION_FIELDS.intersection(children):
+        return _connection_nodes(nodes, info)
+    return nodes
+
+
+def field_selections(info):
+    """Return the selections made directly on the field being resolved."""
+    return _merge_children(info.field_nodes, info)
+
+
+def _plan(model, selections, info, prefix=''):
+    """
+    Work out the columns, joins and prefetches needed for the selected fields
+    of `model`. Returns (only, select_related, prefetches); `only` is None
+    when a selected field is not a plain model field and every column must
+    be loaded.
+    """
+    only = {prefix + model._meta.pk.attname}
+    select_related = []
+    prefetches = []
+    concrete = {f.name: f for f in model._meta.get_fields()}
+
+    for name, nodes in selections.items():
+        if name in ('__typename', 'id'):
+            continue
+        field = concrete.get(to_snake_case(name))
+        if field is None:
+            only = None
+            continue
+
+        if field.one_to_one and not field.concrete:
+            # Reverse one-to-one (e.g. Customer.sales_rollup): joined, but it
+            # has no column on this model to keep in only()
+            path = prefix + field.name
+            select_related.append(path)
+            child_only, child_related, child_prefetches = _plan(
+                field.related_model, _merge_children(nodes, info), info, prefix=path + '__'
+            )
+            if only is not None:
+                only = only | child_only if child_only is not None else None
+            select_related.extend(child_related)
+            prefetches.extend(child_prefetches)
+        elif field.concrete and (field.many_to_one or field.one_to_one):
+            path = prefix + field.name
+            select_related.append(path)
+            child_only, child_related, child_prefetches = _plan(
+                field.related_model, _merge_children(nodes, info), info, prefix=path + '__'
+            )
+            if only is not None:
+                only.add(path)
+                only = only | child_only if child_only is not None else None
+            select_related.extend(child_related)
+            prefetches.extend(child_prefetches)
+        elif field.many_to_many or field.one_to_many:
+            child_selections = _merge_children(_list_nodes(nodes, info), info)
+            child_qs = optimize_queryset(field.related_model.objects.all(), info, child_selections)
+            if field.one_to_many:
+                # The reverse foreign key must be loaded to attach children to parents
+                child_qs = _add_column(child_qs, field.field.attname)
+            prefetches.append(Prefetch(prefix + (field.get_accessor_name() if field.auto_created else field.name), queryset=child_qs))
+        elif only is not None:
+            only.add(prefix + field.attname)
+
+    return only, select_related, prefetches
+
+
+def _add_column(queryset, column):
+    # deferred_loading is (names, defer); defer=False means only(names)
+    names, defer = queryset.query.deferred_loading
+    if not defer and column not in names:
+        queryset = queryset.only(*names, column)
+    return queryset
+
+
+def optimize_queryset(queryset, info, selections=None):
+    """
+    Apply select_related, prefetch_related and only() to `queryset` so it
+    fetches exactly what the GraphQL selection in `info` asks for.
+
+    `selections` defaults to the node selection of the connection field
+    being resolved.
+    """
+    if selections is None:
+        selections = _merge_children(_connection_nodes(info.field_nodes, info), info)
+    if not selections:
+        return queryset
+
+    only, select_related, prefetches = _plan(queryset.model, selections, info)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    if only is not None:
+        queryset = queryset.only(*only)
+    return queryset
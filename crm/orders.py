@@ -0,0 +1,309 @@
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, When
+
+from .cache import response_cache
+from .models import (
+    Customer,
+    Product,
+    Order,
+    OrderLine
+)
+from .rollups import record_orders
+from .subscriptions import publish_order_created, publish_stock_changed
+
+# Products reserved per UPDATE statement
+RESERVE_CHUNK = 500
+
+
+@dataclass
+class LineError:
+    """Why one input line of an order could not be placed."""
+    line: int
+    product_id: str
+    message: str
+    requested: int = None
+    available: int = None
+
+
+@dataclass
+class OrderResult:
+    """Outcome of one input row of place_orders()."""
+    row: int
+    order_id: uuid.UUID = None
+    total_amount: Decimal = None
+    message: str = None
+    errors: list = field(default_factory=list)
+
+    @property
+    def ok(self):
+        return self.order_id is not None
+
+
+class OrderRejected(Exception):
+    """Raised with the per-line errors when an order cannot be placed."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} order line(s) rejected")
+        self.errors = errors
+
+
+def order_items(product_ids=None, lines=None):
+    """
+    Turn the two ways of listing an order's products into (product_id,
+    quantity) pairs: `product_ids` orders one unit of each product, `lines`
+    are (product_id, quantity) pairs. Raises ValueError when both or
+    neither are given.
+    """
+    if product_ids and lines:
+        raise ValueError("Give either productIds or lines, not both")
+    if lines:
+        return list(lines)
+    if product_ids:
+        # Listing a product twice in productIds still orders one unit
+        return [(product_id, 1) for product_id in dict.fromkeys(product_ids)]
+    raise ValueError("At least one product must be selected")
+
+
+def parse_lines(items):
+    """
+    Validate (product_id, quantity) input pairs. Repeated products are
+    merged into their first line. Returns ({product UUID: quantity},
+    {product UUID: input line index}, errors).
+    """
+    quantities, first_line, errors = {}, {}, []
+    for index, (product_id, quantity) in enumerate(items):
+        try:
+            pk = uuid.UUID(str(product_id))
+        except ValueError:
+            errors.append(LineError(index, str(product_id), "Invalid product ID"))
+            continue
+        if not isinstance(quantity, int) or quantity < 1:
+            errors.append(LineError(index, str(product_id), "Quantity must be positive", requested=quantity))
+            continue
+        if pk in quantities:
+            quantities[pk] += quantity
+        else:
+            quantities[pk] = quantity
+            first_line[pk] = index
+    return quantities, first_line, errors
+
+
+def reserve_stock(quantities):
+    """
+    Take `quantities` ({product_id: units}) out of stock with one
+    conditional UPDATE per RESERVE_CHUNK products: a row only matches
+    while it still holds enough stock, so concurrent orders can never
+    drive stock below zero, and a row count short of the number of
+    products means some line could not be reserved.
+
+    Must run inside a transaction. Returns the ids that could not be
+    reserved, in which case nothing was taken and the caller rolls back.
+    """
+    pks = sorted(quantities)
+    while True:
+        savepoint = transaction.savepoint()
+        reserved = 0
+        for start in range(0, len(pks), RESERVE_CHUNK):
+            chunk = pks[start:start + RESERVE_CHUNK]
+            reserved += Product.objects.filter(
+                reduce(or_, (Q(pk=pk, stock__gte=quantities[pk]) for pk in chunk))
+            ).update(stock=Case(
+                *(When(pk=pk, then=F('stock') - quantities[pk]) for pk in chunk),
+                output_field=PositiveIntegerField(),
+            ))
+        if reserved == len(pks):
+            transaction.savepoint_commit(savepoint)
+            return []
+        transaction.savepoint_rollback(savepoint)
+        stock = dict(Product.objects.filter(pk__in=pks).values_list('pk', 'stock'))
+        short = [pk for pk in pks if stock.get(pk, -1) < quantities[pk]]
+        if short:
+            return short
+        # Restocked concurrently since the UPDATE; try again
+
+
+def place_order(customer, items):
+    """
+    Create an order for `customer` from (product_id, quantity) pairs.
+
+    Stock is reserved, the prices snapshotted into the order lines and the
+    rollups updated in one transaction; nothing is written if any line
+    fails, and OrderRejected lists every failing line.
+    """
+    quantities, first_line, errors = parse_lines(items)
+    if errors:
+        raise OrderRejected(errors)
+
+    with transaction.atomic():
+        short = reserve_stock(quantities)
+        # The reserved rows stay locked until commit, so these prices are
+        # the ones in effect for the stock just taken
+        products = {
+            pk: (price, stock)
+            for pk, price, stock in Product.objects.filter(pk__in=quantities).values_list('pk', 'price', 'stock')
+        }
+        for pk in short:
+            if pk in products:
+                errors.append(LineError(
+                    first_line[pk], str(pk), "Insufficient stock",
+                    requested=quantities[pk], available=products[pk][1]
+                ))
+            else:
+                errors.append(LineError(first_line[pk], str(pk), "Product not found"))
+        if errors:
+            errors.sort(key=lambda error: error.line)
+            raise OrderRejected(errors)
+
+        lines = [
+            OrderLine(
+                product_id=pk,
+                quantity=quantity,
+                unit_price=products[pk][0],
+                line_total=products[pk][0] * quantity,
+            )
+            for pk, quantity in quantities.items()
+        ]
+        order = Order.objects.create(
+            customer=customer,
+            total_amount=sum(line.line_total for line in lines)
+        )
+        for line in lines:
+            line.order = order
+        OrderLine.objects.bulk_create(lines)
+
+        record_orders([(order, lines)])
+        response_cache.invalidate(Order, Product)
+        publish_order_created([order.pk])
+        publish_stock_changed(list(quantities))
+
+    return order
+
+
+def place_orders(rows, chunk_size=500, reserve=True):
+    """
+    Create orders from (customer_id, items) rows, where `items` are the
+    (product_id, quantity) pairs taken by place_order(). Yields an
+    OrderResult per row, in input order.
+
+    Rows are written in chunks, each in its own transaction: the chunk's
+    customers and products are read with one query each, every order and
+    order line is written with bulk_create and totals are computed in
+    memory. With `reserve`, the chunk's products are locked up front
+    and stock is handed out to the rows in input order, so a row that no
+    longer fits is rejected on its own; the stock taken is written back
+    with reserve_stock(), and handed out again if another order got there
+    first. Without it, stock
+    is left untouched (for importing orders that were already fulfilled
+    upstream).
+    """
+    rows = iter(enumerate(rows))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield from _place_chunk(chunk, reserve)
+
+
+def _place_chunk(chunk, reserve):
+    results = []
+    parsed = []  # (result, customer UUID, quantities, first_line)
+    for index, (customer_id, items) in chunk:
+        result = OrderResult(row=index)
+        results.append(result)
+        quantities, first_line, result.errors = parse_lines(items)
+        try:
+            customer_pk = uuid.UUID(str(customer_id))
+        except ValueError:
+            result.message = "Invalid customer ID"
+            continue
+        if not result.errors:
+            parsed.append((result, customer_pk, quantities, first_line))
+
+    customers = Customer.objects.only('pk').in_bulk({pk for _, pk, _, _ in parsed})
+    product_ids = {pk for _, _, quantities, _ in parsed for pk in quantities}
+
+    with transaction.atomic():
+        products = Product.objects.filter(pk__in=product_ids).only('pk', 'price', 'stock').order_by('pk')
+        if reserve:
+            products = products.select_for_update()
+        products = {product.pk: product for product in products}
+        stock = {pk: product.stock for pk, product in products.items()}
+
+        while True:
+            placed, taken = _allocate(parsed, customers, products, stock, reserve)
+            short = reserve_stock(taken)
+            if not short:
+                break
+            # Another order took some of this stock after it was read
+            # (SQLite cannot lock rows). Nothing was taken; hand out what
+            # is left again. The write lock is held from here on, so the
+            # stock read now cannot change before commit.
+            current = dict(Product.objects.filter(pk__in=short).values_list('pk', 'stock'))
+            for pk in short:
+                if pk in current:
+                    stock[pk] = current[pk]
+                else:
+                    del products[pk]
+
+        if placed:
+            Order.objects.bulk_create([order for order, _ in placed])
+            OrderLine.objects.bulk_create([line for _, lines in placed for line in lines])
+            record_orders(placed)
+            response_cache.invalidate(Order, Product)
+            publish_order_created([order.pk for order, _ in placed])
+            publish_stock_changed(list(taken))
+
+    return results
+
+
+def _allocate(parsed, customers, products, stock, reserve):
+    """
+    Build the chunk's orders in input order, handing out `stock` until a
+    row no longer fits. Returns the (order, lines) pairs to create and
+    the units taken per product.
+    """
+    remaining = dict(stock)
+    taken = {}
+    placed = []
+    for result, customer_pk, quantities, first_line in parsed:
+        result.errors, result.order_id, result.total_amount = [], None, None
+        if customer_pk not in customers:
+            result.message = "Invalid customer ID"
+            continue
+        for pk, quantity in quantities.items():
+            if pk not in products:
+                result.errors.append(LineError(first_line[pk], str(pk), "Product not found"))
+            elif reserve and remaining[pk] < quantity:
+                result.errors.append(LineError(
+                    first_line[pk], str(pk), "Insufficient stock",
+                    requested=quantity, available=remaining[pk]
+                ))
+        if result.errors:
+            result.errors.sort(key=lambda error: error.line)
+            continue
+
+        lines = [
+            OrderLine(
+                product_id=pk,
+                quantity=quantity,
+                unit_price=products[pk].price,
+                line_total=products[pk].price * quantity,
+            )
+            for pk, quantity in quantities.items()
+        ]
+        order = Order(customer_id=customer_pk, total_amount=sum(line.line_total for line in lines))
+        for line in lines:
+            line.order = order
+            if reserve:
+                remaining[line.product_id] -= line.quantity
+                taken[line.product_id] = taken.get(line.product_id, 0) + line.quantity
+        result.order_id, result.total_amount = order.pk, order.total_amount
+        placed.append((order, lines))
+    return placed, taken
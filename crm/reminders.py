@@ -0,0 +1,157 @@
+import sys
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Order
+
+LOG_PATH = "/tmp/order_reminders_log.txt"
+
+DEFAULTS = {
+    'BACKEND': 'crm.reminders.FileReminderBackend',
+    'OPTIONS': {},
+    'DAYS': 7,
+    'BATCH_SIZE': 500,
+}
+
+
+def reminder_settings():
+    return {**DEFAULTS, **getattr(settings, 'ORDER_REMINDERS', {})}
+
+
+@dataclass
+class Reminder:
+    """One reminder per customer, covering all of their orders in the window."""
+    email: str
+    order_ids: list = field(default_factory=list)
+
+
+def pending_reminders(days=7, now=None, chunk_size=2000):
+    """
+    Yield a Reminder per customer with orders in the last `days` days.
+
+    A single joined values_list query reads (customer_id, order_id, email)
+    sorted by customer, so orders are grouped while streaming without
+    holding the whole window in memory. Each reminder lists the customer's
+    orders newest first.
+    """
+    now = now or timezone.now()
+    rows = (
+        Order.objects
+        .filter(order_date__gte=now - timedelta(days=days), order_date__lt=now)
+        .order_by('customer_id', '-order_date', 'order_id')
+        .values_list('customer_id', 'order_id', 'customer__email')
+        .iterator(chunk_size=chunk_size)
+    )
+    current_customer, reminder = None, None
+    for customer_id, order_id, email in rows:
+        if customer_id != current_customer:
+            if reminder is not None:
+                yield reminder
+            current_customer, reminder = customer_id, Reminder(email=email)
+        reminder.order_ids.append(order_id)
+    if reminder is not None:
+        yield reminder
+
+
+class BaseReminderBackend:
+    """
+    Delivers batches of reminders. Subclasses implement send_messages(),
+    which returns the number of reminders sent.
+    """
+
+    def __init__(self, **kwargs):
+        pass
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send_messages(self, reminders):
+        raise NotImplementedError
+
+    @staticmethod
+    def format(reminder, timestamp):
+        order_ids = ", ".join(str(order_id) for order_id in reminder.order_ids)
+        return f"[{timestamp}] Order ID: {order_ids}, Customer Email: {reminder.email}\n"
+
+
+class FileReminderBackend(BaseReminderBackend):
+    """Append one line per reminder to a log file, one write per batch."""
+
+    def __init__(self, path=LOG_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.stream = None
+
+    def open(self):
+        if self.stream is None:
+            self.stream = open(self.path, "a")
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def send_messages(self, reminders):
+        timestamp = timezone.now().isoformat()
+        self.stream.write("".join(self.format(reminder, timestamp) for reminder in reminders))
+        self.stream.flush()
+        return len(reminders)
+
+
+class ConsoleReminderBackend(BaseReminderBackend):
+    """Write reminders to stdout (or another stream), for development."""
+
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream or sys.stdout
+
+    def send_messages(self, reminders):
+        timestamp = timezone.now().isoformat()
+        self.stream.write("".join(self.format(reminder, timestamp) for reminder in reminders))
+        self.stream.flush()
+        return len(reminders)
+
+
+def get_backend(backend=None, **kwargs):
+    """Instantiate the configured (or given dotted path) reminder backend."""
+    config = reminder_settings()
+    klass = import_string(backend or config['BACKEND'])
+    return klass(**{**config['OPTIONS'], **kwargs})
+
+
+def send_order_reminders(days=None, batch_size=None, backend=None, now=None):
+    """
+    Send a reminder to every customer with recent orders, handing them to
+    the backend in batches. Returns (customers reminded, orders covered).
+    """
+    config = reminder_settings()
+    days = config['DAYS'] if days is None else days
+    batch_size = batch_size or config['BATCH_SIZE']
+    if backend is None or isinstance(backend, str):
+        backend = get_backend(backend)
+
+    reminders = pending_reminders(days=days, now=now)
+    sent = orders = 0
+    with backend:
+        while True:
+            batch = list(islice(reminders, batch_size))
+            if not batch:
+                break
+            sent += backend.send_messages(batch)
+            orders += sum(len(reminder.order_ids) for reminder in batch)
+    return sent, orders
@@ -0,0 +1,91 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+DEFAULTS = {
+    # Alias serving replica reads; ignored while it is not in DATABASES
+    'READ_ALIAS': 'replica',
+    # After a mutation, the client's reads stay on the primary this long
+    # (longer than the replication lag) through this cookie
+    'STICKY_COOKIE': 'crm_primary',
+    'STICKY_SECONDS': 10,
+}
+
+_use_replica = ContextVar('crm_use_replica', default=False)
+
+
+def replica_settings():
+    return {**DEFAULTS, **getattr(settings, 'DATABASE_REPLICAS', {})}
+
+
+def replica_alias():
+    """The read replica's alias, or the primary's when none is configured."""
+    alias = replica_settings()['READ_ALIAS']
+    return alias if alias in settings.DATABASES else DEFAULT_DB_ALIAS
+
+
+def read_alias():
+    """The alias reads go to in the current context."""
+    return replica_alias() if _use_replica.get() else DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """
+    Send the ORM reads made inside the block to the read replica. Writes
+    always go to the primary, and the first write in the block moves the
+    remaining reads back to it.
+    """
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def stick_to_primary():
+    """Read from the primary for the rest of the current use_replica() block."""
+    _use_replica.set(False)
+
+
+def is_sticky(request):
+    """Whether `request` comes from a client that wrote recently."""
+    return (
+        getattr(request, '_crm_primary', False)
+        or replica_settings()['STICKY_COOKIE'] in request.COOKIES
+    )
+
+
+def mark_sticky(request):
+    """Keep this request's and the client's next reads on the primary."""
+    request._crm_primary = True
+
+
+def set_sticky_cookie(request, response):
+    if getattr(request, '_crm_primary', False):
+        config = replica_settings()
+        response.set_cookie(config['STICKY_COOKIE'], '1', max_age=config['STICKY_SECONDS'], httponly=True)
+    return response
+
+
+class ReplicaRouter:
+    """
+    Routes reads to the replica inside use_replica() blocks (GraphQL
+    queries, reporting tasks, exports) and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        stick_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        aliases = {DEFAULT_DB_ALIAS, replica_settings()['READ_ALIAS']}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,47 @@
+import json
+import os
+
+LOG_PATH = "/tmp/crm_report_log.txt"
+OUTPUT_DIR = "/tmp/crm_reports"
+
+
+def claim_report_run(day, output_dir=OUTPUT_DIR):
+    """
+    Atomically claim the report run for `day` by creating a marker file.
+    Returns False when the report for that day was already generated.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    marker = os.path.join(output_dir, f"{day.isoformat()}.done")
+    try:
+        fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+
+def release_report_run(day, output_dir=OUTPUT_DIR):
+    """Remove the marker for `day` so a failed run can be retried."""
+    try:
+        os.remove(os.path.join(output_dir, f"{day.isoformat()}.done"))
+    except FileNotFoundError:
+        pass
+
+
+def write_crm_report(report, day, log_path=LOG_PATH, output_dir=OUTPUT_DIR):
+    """
+    Write the structured report as JSON and append the summary line to the log.
+    Returns the path of the JSON file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"crm_report_{day.isoformat()}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    totals = report['totals']
+    with open(log_path, "a") as log_file:
+        log_file.write(
+            f"{report['generated_at']} - Report: {totals['customers']} customers, "
+            f"{totals['orders']} orders, {totals['revenue']} revenue\n"
+        )
+    return path
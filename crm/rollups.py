@@ -0,0 +1,183 @@
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    Count,
+    DecimalField,
+    F,
+    Max,
+    PositiveIntegerField,
+    Q,
+    Sum,
+    Value,
+    When
+)
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import response_cache
+from .models import (
+    Customer,
+    Order,
+    DailySalesRollup,
+    CustomerSalesRollup,
+    OrderLine,
+    ProductSalesRollup
+)
+
+ROLLUP_UPDATE_CHUNK = 500
+
+
+def record_orders(orders):
+    """
+    Add freshly created orders to the sales rollups.
+
+    `orders` is an iterable of (order, lines) pairs: the order's
+    total_amount is already final and `lines` are its OrderLine rows.
+    Missing rollup rows are inserted with zero values first and then
+    incremented with F() expressions, so concurrent writers never lose an
+    increment. Call it inside the transaction that creates
+    the orders.
+    """
+    days = defaultdict(lambda: [0, Decimal('0')])
+    customers = defaultdict(lambda: [0, Decimal('0'), None])
+    products = defaultdict(lambda: [0, Decimal('0')])
+
+    for order, lines in orders:
+        total = Decimal(order.total_amount or 0)
+        day = days[timezone.localdate(order.order_date)]
+        day[0] += 1
+        day[1] += total
+        customer = customers[order.customer_id]
+        customer[0] += 1
+        customer[1] += total
+        if customer[2] is None or order.order_date > customer[2]:
+            customer[2] = order.order_date
+        for line in lines:
+            product = products[line.product_id]
+            product[0] += line.quantity
+            product[1] += line.line_total
+
+    if not days:
+        return
+
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(day=day) for day in days], ignore_conflicts=True
+    )
+    for day, (count, revenue) in days.items():
+        DailySalesRollup.objects.filter(day=day).update(
+            order_count=F('order_count') + count,
+            revenue=F('revenue') + revenue,
+        )
+
+    CustomerSalesRollup.objects.bulk_create(
+        [CustomerSalesRollup(customer_id=pk) for pk in customers], ignore_conflicts=True
+    )
+    # Like the products below: one UPDATE per chunk of customers
+    customer_ids = list(customers)
+    for start in range(0, len(customer_ids), ROLLUP_UPDATE_CHUNK):
+        chunk = customer_ids[start:start + ROLLUP_UPDATE_CHUNK]
+        CustomerSalesRollup.objects.filter(customer_id__in=chunk).update(
+            order_count=F('order_count') + _per_row('customer_id', chunk, customers, 0, PositiveIntegerField()),
+            revenue=F('revenue') + _per_row(
+                'customer_id', chunk, customers, 1, DecimalField(max_digits=14, decimal_places=2)
+            ),
+            # Only ever moves forward, whatever order concurrent writers commit in
+            last_order_date=Case(
+                *(
+                    When(
+                        Q(customer_id=pk) & (Q(last_order_date__isnull=True) | Q(last_order_date__lt=customers[pk][2])),
+                        then=Value(customers[pk][2]),
+                    )
+                    for pk in chunk
+                ),
+                default=F('last_order_date'),
+            ),
+        )
+
+    ProductSalesRollup.objects.bulk_create(
+        [ProductSalesRollup(product_id=pk) for pk in products], ignore_conflicts=True
+    )
+    # One UPDATE per chunk of products, each row picking its own increment
+    product_ids = list(products)
+    for start in range(0, len(product_ids), ROLLUP_UPDATE_CHUNK):
+        chunk = product_ids[start:start + ROLLUP_UPDATE_CHUNK]
+        ProductSalesRollup.objects.filter(product_id__in=chunk).update(
+            units_sold=F('units_sold') + _per_row('product_id', chunk, products, 0, PositiveIntegerField()),
+            revenue=F('revenue') + _per_row(
+                'product_id', chunk, products, 1, DecimalField(max_digits=14, decimal_places=2)
+            ),
+        )
+
+    response_cache.invalidate(DailySalesRollup, CustomerSalesRollup, ProductSalesRollup)
+
+
+def _per_row(key, pks, values, index, output_field):
+    # The increment for each row of an UPDATE over several rollup rows
+    return Case(
+        *(When(**{key: pk}, then=Value(values[pk][index])) for pk in pks),
+        output_field=output_field,
+    )
+
+
+def _bulk_insert(model, rows, batch_size=1000):
+    """Insert a lazily generated sequence of rows in batches; returns the row count."""
+    rows = iter(rows)
+    written = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return written
+        model.objects.bulk_create(batch)
+        written += len(batch)
+
+
+@transaction.atomic
+def rebuild_rollups(batch_size=1000):
+    """
+    Recompute every rollup table from the Order table.
+    Returns the number of rows written per table.
+    """
+    DailySalesRollup.objects.all().delete()
+    CustomerSalesRollup.objects.all().delete()
+    ProductSalesRollup.objects.all().delete()
+
+    daily = _bulk_insert(DailySalesRollup, (
+        DailySalesRollup(day=row['day'], order_count=row['orders'], revenue=row['revenue'] or 0)
+        for row in Order.objects
+        .annotate(day=TruncDate('order_date'))
+        .values('day')
+        .annotate(orders=Count('pk'), revenue=Sum('total_amount'))
+        .order_by()
+        .iterator(chunk_size=batch_size)
+    ), batch_size)
+
+    customers = _bulk_insert(CustomerSalesRollup, (
+        CustomerSalesRollup(
+            customer_id=row['customer_id'],
+            order_count=row['orders'],
+            revenue=row['revenue'] or 0,
+            last_order_date=row['last_order_date'],
+        )
+        for row in Order.objects
+        .filter(customer__in=Customer.objects.all())
+        .values('customer_id')
+        .annotate(orders=Count('pk'), revenue=Sum('total_amount'), last_order_date=Max('order_date'))
+        .order_by()
+        .iterator(chunk_size=batch_size)
+    ), batch_size)
+
+    products = _bulk_insert(ProductSalesRollup, (
+        ProductSalesRollup(product_id=row['product_id'], units_sold=row['units'], revenue=row['revenue'] or 0)
+        for row in OrderLine.objects
+        .values('product_id')
+        .annotate(units=Sum('quantity'), revenue=Sum('line_total'))
+        .order_by()
+        .iterator(chunk_size=batch_size)
+    ), batch_size)
+
+    response_cache.invalidate(DailySalesRollup, CustomerSalesRollup, ProductSalesRollup)
+    return {'daily': daily, 'customers': customers, 'products': products}
@@ -1,21 +1,41 @@
 import graphene
 from graphene import relay
 from graphene_django import DjangoObjectType
-from graphene_django.filter import DjangoFilterConnectionField
+from graphene_django.settings import graphene_settings
+from django.core.exceptions import ValidationError
 from django.db import transaction, IntegrityError
+from django.db.models import F
 from graphql import GraphQLError
 from decimal import Decimal as PythonDecimal
 
 from .models import (
     Customer,
     Product,
-    Order
+    Order,
+    OrderLine,
+    DailySalesRollup,
+    CustomerSalesRollup,
+    ProductSalesRollup
 )
 from .filters import (
     CustomerFilter,
     ProductFilter,
     OrderFilter
 )
+from .aio import alist, in_event_loop
+from .cache import response_cache
+from .catalog import upsert_products
+from .fields import KeysetConnectionField
+from .loaders import get_loaders, prefetched
+from .optimizer import field_selections, optimize_queryset
+from .orders import OrderRejected, order_items, place_order, place_orders
+from .search import index_objects
+from .subscriptions import (
+    ORDER_CREATED,
+    PRODUCT_STOCK_CHANGED,
+    listen,
+    publish_stock_changed
+)
 
 class FlexibleDecimal(graphene.Scalar):
     """A Decimal scalar that accepts strings, floats, and ints"""
@@ -42,20 +62,49 @@ class FlexibleDecimal(graphene.Scalar):
             return None
 
 
+class CountableConnection(relay.Connection):
+    """Connection exposing an optional totalCount, only counted when selected"""
+    class Meta:
+        abstract = True
+
+    total_count = graphene.Int()
+
+    def resolve_total_count(root, info, **kwargs):
+        if getattr(root, 'length', None) is not None:
+            return root.length
+        if in_event_loop():
+            return root.iterable.acount()
+        return root.iterable.count()
+
+
 #Declaring the objects types
 class CustomerType(DjangoObjectType):
     class Meta:
         model= Customer
         fields= '__all__'
         interfaces=(relay.Node,)
-        
+        connection_class=CountableConnection
+
+    def resolve_purchases(self, info, **kwargs):
+        orders = prefetched(self, 'purchases')
+        if orders is not None:
+            return orders
+        return get_loaders(info.context).orders_by_customer.load(self.pk)
+
 
 class ProductType(DjangoObjectType):
     price = FlexibleDecimal()
     class Meta:
         model= Product
-        fields= '__all__'
+        exclude= ('order_lines',)
         interfaces=(relay.Node,)
+        connection_class=CountableConnection
+
+    def resolve_dispatched_orders(self, info, **kwargs):
+        orders = prefetched(self, 'dispatched_orders')
+        if orders is not None:
+            return orders
+        return get_loaders(info.context).orders_by_product.load(self.pk)
 
 
 class OrderType(DjangoObjectType):
@@ -63,6 +112,54 @@ class OrderType(DjangoObjectType):
         model= Order
         fields= '__all__'
         interfaces=(relay.Node,)
+        connection_class=CountableConnection
+
+    def resolve_customer(self, info):
+        if Order.customer.is_cached(self):
+            return self.customer
+        return get_loaders(info.context).customer_by_id.load(self.customer_id)
+
+    def resolve_product(self, info, **kwargs):
+        products = prefetched(self, 'product')
+        if products is not None:
+            return products
+        return get_loaders(info.context).products_by_order.load(self.pk)
+
+    def resolve_lines(self, info, **kwargs):
+        lines = prefetched(self, 'lines')
+        if lines is not None:
+            return lines
+        return get_loaders(info.context).lines_by_order.load(self.pk)
+
+
+class OrderLineType(DjangoObjectType):
+    unit_price = FlexibleDecimal()
+    line_total = FlexibleDecimal()
+    class Meta:
+        model= OrderLine
+        fields= ('product', 'quantity', 'unit_price', 'line_total')
+
+
+# Sales rollups, read directly by the analytics query fields
+class DailySalesType(DjangoObjectType):
+    revenue = FlexibleDecimal()
+    class Meta:
+        model= DailySalesRollup
+        fields= ('day', 'order_count', 'revenue')
+
+
+class CustomerSalesType(DjangoObjectType):
+    revenue = FlexibleDecimal()
+    class Meta:
+        model= CustomerSalesRollup
+        fields= ('customer', 'order_count', 'revenue', 'last_order_date')
+
+
+class ProductSalesType(DjangoObjectType):
+    revenue = FlexibleDecimal()
+    class Meta:
+        model= ProductSalesRollup
+        fields= ('product', 'units_sold', 'revenue')
 
 
 #Declaring the input object types
@@ -75,10 +172,27 @@ class ProductInput(graphene.InputObjectType):
     name=graphene.String(required=True)
     price= graphene.Float(required=True)
     stock=graphene.Int(required=False, default_value=0)
+    sku=graphene.String(required=False)
+
+class ProductUpsertInput(graphene.InputObjectType):
+    sku = graphene.String(required=True)
+    name = graphene.String(required=True)
+    price = FlexibleDecimal(required=True)
+    stock = graphene.Int(required=False, description="Left unchanged on existing products when omitted")
+
+class OrderLineInput(graphene.InputObjectType):
+    product_id = graphene.ID(name="productId", required=True)
+    quantity = graphene.Int(required=False, default_value=1)
 
 class OrderInput(graphene.InputObjectType):
     customer_id = graphene.ID(name="customerId", required=True)
-    product_ids = graphene.List(graphene.ID, name="productIds", required=True)
+    product_ids = graphene.List(
+        graphene.ID,
+        name="productIds",
+        required=False,
+        description="One unit of each product; use lines to order quantities"
+    )
+    lines = graphene.List(OrderLineInput, required=False)
 
 
 # Mutation Responses
@@ -93,8 +207,33 @@ class BulkCustomerResult(graphene.ObjectType):
 class CreateProductPayload(graphene.ObjectType):
     product = graphene.Field(ProductType)
 
+class BulkUpsertProductsPayload(graphene.ObjectType):
+    created = graphene.Int()
+    updated = graphene.Int()
+    errors = graphene.List(graphene.String)
+
+class OrderLineError(graphene.ObjectType):
+    line = graphene.Int(description="Index of the rejected line in the input")
+    product_id = graphene.ID()
+    message = graphene.String()
+    requested = graphene.Int()
+    available = graphene.Int()
+
 class CreateOrderPayload(graphene.ObjectType):
     order = graphene.Field(OrderType)
+    errors = graphene.List(OrderLineError, description="Set, with no order, when any line was rejected")
+
+class BulkOrderResult(graphene.ObjectType):
+    row = graphene.Int(description="Index of the order in the input")
+    order_id = graphene.ID()
+    total_amount = FlexibleDecimal()
+    message = graphene.String(description="Why the whole row was rejected")
+    errors = graphene.List(OrderLineError)
+
+class BulkCreateOrdersPayload(graphene.ObjectType):
+    created = graphene.Int()
+    failed = graphene.Int()
+    results = graphene.List(BulkOrderResult)
 
 
 
@@ -123,34 +262,100 @@ class CreateCustomer(graphene.Mutation):
             raise GraphQLError(str(e))
         
 
+def chunked(items, size):
+    """Yield successive lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
 class BulkCreateCustomers(graphene.Mutation):
     class Arguments:
         input = graphene.List(CustomerInput, required=True)
+        chunk_size = graphene.Int(required=False, default_value=500)
+        upsert = graphene.Boolean(
+            required=False,
+            default_value=False,
+            description="Update name/phone of customers whose email already exists"
+        )
 
     Output = BulkCustomerResult
 
     @staticmethod
-    @transaction.atomic
-    def mutate(root, info, input):
-        created = []
+    def mutate(root, info, input, chunk_size=500, upsert=False):
+        if chunk_size is None or chunk_size < 1:
+            raise GraphQLError("chunkSize must be a positive integer")
+
         errors = []
+        rows = {}  # email -> (row index, customer), first occurrence wins
 
+        # Validate every row in memory; uniqueness is checked in bulk below
         for idx, data in enumerate(input):
+            customer = Customer(
+                name=data.name,
+                email=data.email,
+                phone=data.phone or ''
+            )
             try:
-                customer = Customer(
-                    name=data.name,
-                    email=data.email,
-                    phone=data.phone or None
-                )
-                customer.full_clean()  # Validate model fields
-                customer.save()
-                created.append(customer)
-            except IntegrityError:
-                errors.append(f"Row {idx+1}: Email '{data.email}' already exists")
+                customer.full_clean(validate_unique=False)
             except Exception as e:
-                errors.append(f"Row {idx+1}: {str(e)}")
+                errors.append((idx, f"Row {idx+1}: {str(e)}"))
+                continue
+            if customer.email in rows:
+                errors.append((idx, f"Row {idx+1}: Email '{data.email}' is duplicated in the input"))
+                continue
+            rows[customer.email] = (idx, customer)
+
+        emails = list(rows)
+        existing = {}
+        for chunk in chunked(emails, chunk_size):
+            existing.update(
+                Customer.objects.filter(email__in=chunk).values_list('email', 'pk')
+            )
 
-        return BulkCustomerResult(customers=created, errors=errors or None)
+        to_create = []
+        to_update = []
+        for email, (idx, customer) in rows.items():
+            if email not in existing:
+                to_create.append((idx, customer))
+            elif upsert:
+                customer.pk = existing[email]
+                to_update.append((idx, customer))
+            else:
+                errors.append((idx, f"Row {idx+1}: Email '{email}' already exists"))
+
+        saved = []
+        for chunk in chunked(to_update, chunk_size):
+            with transaction.atomic():
+                Customer.objects.bulk_update([c for _, c in chunk], ['name', 'phone'])
+                index_objects(Customer, [c.pk for _, c in chunk])
+            saved.extend(chunk)
+
+        # Each chunk commits on its own, so a conflicting row only costs its chunk
+        for chunk in chunked(to_create, chunk_size):
+            try:
+                with transaction.atomic():
+                    Customer.objects.bulk_create([c for _, c in chunk])
+                    index_objects(Customer, [c.pk for _, c in chunk])
+                saved.extend(chunk)
+            except IntegrityError:
+                # Lost a race with a concurrent insert; retry the chunk row by row
+                for idx, customer in chunk:
+                    try:
+                        with transaction.atomic():
+                            customer.save(force_insert=True)
+                        saved.append((idx, customer))
+                    except IntegrityError:
+                        errors.append((idx, f"Row {idx+1}: Email '{customer.email}' already exists"))
+
+        if saved:
+            response_cache.invalidate(Customer)
+
+        saved.sort(key=lambda row: row[0])
+        errors.sort(key=lambda row: row[0])
+        return BulkCustomerResult(
+            customers=[c for _, c in saved],
+            errors=[message for _, message in errors] or None
+        )
 
 class CreateProduct(graphene.Mutation):
     class Arguments:
@@ -165,13 +370,65 @@ class CreateProduct(graphene.Mutation):
         if input.stock < 0:
             raise GraphQLError("Stock cannot be negative")
 
-        product = Product.objects.create(
-            name=input.name,
-            price=input.price,
-            stock=input.stock
-        )
+        try:
+            product = Product.objects.create(
+                name=input.name,
+                price=input.price,
+                stock=input.stock,
+                sku=input.sku or None
+            )
+        except IntegrityError:
+            raise GraphQLError("SKU already exists")
         return CreateProductPayload(product=product)
 
+
+class BulkUpsertProducts(graphene.Mutation):
+    """Create or update products by SKU; see crm.catalog.upsert_products"""
+    class Arguments:
+        input = graphene.List(ProductUpsertInput, required=True)
+        chunk_size = graphene.Int(required=False, default_value=1000)
+
+    Output = BulkUpsertProductsPayload
+
+    @staticmethod
+    def mutate(root, info, input, chunk_size=1000):
+        if chunk_size is None or chunk_size < 1:
+            raise GraphQLError("chunkSize must be a positive integer")
+
+        created = updated = 0
+        errors = []
+        for result in upsert_products((dict(row) for row in input), chunk_size=chunk_size):
+            created += result.created
+            updated += result.updated
+            errors.extend(message for _, message in result.errors)
+        return BulkUpsertProductsPayload(created=created, updated=updated, errors=errors or None)
+
+def input_items(data):
+    """(product_id, quantity) pairs of an OrderInput."""
+    lines = [(line.product_id, line.quantity) for line in data.lines or []]
+    return order_items(data.product_ids, lines)
+
+
+def top_limit(first):
+    """Validate the `first` of a top-N list and cap it like a connection page."""
+    if first < 1:
+        raise GraphQLError("Argument `first` must be a positive integer.")
+    return min(first, graphene_settings.RELAY_CONNECTION_MAX_LIMIT or first)
+
+
+def line_errors(errors):
+    return [
+        OrderLineError(
+            line=error.line,
+            product_id=error.product_id,
+            message=error.message,
+            requested=error.requested,
+            available=error.available
+        )
+        for error in errors
+    ]
+
+
 class CreateOrder(graphene.Mutation):
     class Arguments:
         input = OrderInput(required=True)
@@ -180,32 +437,79 @@ class CreateOrder(graphene.Mutation):
 
     @staticmethod
     def mutate(root, info, input):
-        if not input.product_ids:
-            raise GraphQLError("At least one product must be selected")
+        try:
+            items = input_items(input)
+        except ValueError as e:
+            raise GraphQLError(str(e))
 
         try:
             customer = Customer.objects.get(pk=input.customer_id)
-        except Customer.DoesNotExist:
+        except (Customer.DoesNotExist, ValidationError):
             raise GraphQLError("Invalid customer ID")
 
-        products = []
-        for pid in input.product_ids:
-            try:
-                products.append(Product.objects.get(pk=pid))
-            except Product.DoesNotExist:
-                raise GraphQLError(f"Invalid product ID: {pid}")
+        try:
+            order = place_order(customer, items)
+        except OrderRejected as e:
+            return CreateOrderPayload(order=None, errors=line_errors(e.errors))
+        return CreateOrderPayload(order=order)
 
-        order = Order.objects.create(customer=customer)
-        order.products.set(products)
-        order.save()  # Triggers total_amount calculation
 
-        return CreateOrderPayload(order=order)
+class BulkCreateOrders(graphene.Mutation):
+    class Arguments:
+        input = graphene.List(OrderInput, required=True)
+        chunk_size = graphene.Int(required=False, default_value=500)
+        reserve_stock = graphene.Boolean(
+            required=False,
+            default_value=True,
+            description="Take the ordered units out of stock; disable for orders already fulfilled upstream"
+        )
+
+    Output = BulkCreateOrdersPayload
+
+    @staticmethod
+    def mutate(root, info, input, chunk_size=500, reserve_stock=True):
+        if chunk_size is None or chunk_size < 1:
+            raise GraphQLError("chunkSize must be a positive integer")
+
+        results = [None] * len(input)
+        rows = []  # (input index, (customer_id, items))
+        for idx, data in enumerate(input):
+            try:
+                rows.append((idx, (data.customer_id, input_items(data))))
+            except ValueError as e:
+                results[idx] = BulkOrderResult(row=idx, message=str(e))
+
+        placed = place_orders([row for _, row in rows], chunk_size=chunk_size, reserve=reserve_stock)
+        for (idx, _), result in zip(rows, placed):
+            results[idx] = BulkOrderResult(
+                row=idx,
+                order_id=result.order_id,
+                total_amount=result.total_amount,
+                message=result.message,
+                errors=line_errors(result.errors) or None
+            )
+
+        created = sum(1 for result in results if result.order_id is not None)
+        return BulkCreateOrdersPayload(created=created, failed=len(results) - created, results=results)
 
 
 class UpdateLowStockProducts(graphene.Mutation):
     class Arguments:
-        # You can add arguments later if needed (e.g., amount_to_add)
-        pass
+        threshold = graphene.Int(
+            required=False,
+            default_value=10,
+            description="Restock products whose stock is below this value"
+        )
+        amount = graphene.Int(
+            required=False,
+            default_value=10,
+            description="Units added to each low-stock product"
+        )
+        limit = graphene.Int(
+            required=False,
+            default_value=100,
+            description="Maximum number of restocked products returned in the payload"
+        )
 
     # Return fields
     success = graphene.Boolean()
@@ -214,10 +518,31 @@ class UpdateLowStockProducts(graphene.Mutation):
     message = graphene.String()
 
     @staticmethod
-    def mutate(root, info):
-        low_stock_products = list(Product.objects.filter(stock__lt=10))
+    def mutate(root, info, threshold=10, amount=10, limit=100):
+        if amount is None or amount <= 0:
+            raise GraphQLError("Amount must be positive")
+        if threshold is None or threshold < 0:
+            raise GraphQLError("Threshold cannot be negative")
+        if limit is None or limit < 0:
+            raise GraphQLError("Limit cannot be negative")
 
-        if not low_stock_products:
+        try:
+            with transaction.atomic():
+                low_stock = Product.objects.filter(stock__lt=threshold)
+                # Lock the rows so the ones echoed back and published are
+                # guaranteed to be part of the UPDATE
+                locked_ids = list(
+                    low_stock.select_for_update().order_by('stock', 'pk').values_list('pk', flat=True)
+                )
+                returned_ids = locked_ids[:limit]
+                updated_count = low_stock.update(stock=F('stock') + amount)
+                if updated_count:
+                    response_cache.invalidate(Product)
+                    publish_stock_changed(locked_ids)
+        except Exception as e:
+            raise GraphQLError(f"Failed to update stock: {str(e)}")
+
+        if not updated_count:
             return UpdateLowStockProducts(
                 success=True,
                 updated_count=0,
@@ -225,22 +550,13 @@ class UpdateLowStockProducts(graphene.Mutation):
                 message="No products with low stock found."
             )
 
-        try:
-            updated_products = []
-            for product in low_stock_products:
-                product.stock += 10  
-                product.save()
-                updated_products.append(product)
-
-            return UpdateLowStockProducts(
-                success=True,
-                updated_count=len(updated_products),
-                products=updated_products,
-                message=f"Successfully restocked {len(updated_products)} product(s)."
-            )
-
-        except Exception as e:
-            raise GraphQLError(f"Failed to update stock: {str(e)}")
+        products = list(Product.objects.filter(pk__in=returned_ids).order_by('stock', 'pk'))
+        return UpdateLowStockProducts(
+            success=True,
+            updated_count=updated_count,
+            products=products,
+            message=f"Successfully restocked {updated_count} product(s)."
+        )
 
 
 
@@ -249,68 +565,143 @@ class Query(graphene.ObjectType):
     """
     Query class responsible for graphql querying
     """
-    customers = DjangoFilterConnectionField(
+    customers = KeysetConnectionField(
         CustomerType,
+        default_ordering=('customer_id',),
         filterset_class=CustomerFilter,
         description="Filterable list of customers"
     )
-    products = DjangoFilterConnectionField(
+    products = KeysetConnectionField(
         ProductType,
+        default_ordering=('product_id',),
         filterset_class=ProductFilter,  
         description="Filterable and paginated list of products"
     ) 
-    orders = DjangoFilterConnectionField(
+    orders = KeysetConnectionField(
         OrderType,
+        default_ordering=('order_date', 'order_id'),
         filterset_class=OrderFilter,
         description="Filterable and paginated list of orders"
     )
-    all_customers = DjangoFilterConnectionField(
+    all_customers = KeysetConnectionField(
         CustomerType,
+        default_ordering=('customer_id',),
         filterset_class=CustomerFilter,
     )
-    all_products = DjangoFilterConnectionField(
+    all_products = KeysetConnectionField(
         ProductType,
+        default_ordering=('product_id',),
         filterset_class=ProductFilter,
     )
-    all_orders = DjangoFilterConnectionField(
+    all_orders = KeysetConnectionField(
         OrderType,
+        default_ordering=('order_date', 'order_id'),
         filterset_class=OrderFilter,
     )
 
+    daily_sales = graphene.List(
+        DailySalesType,
+        start=graphene.Date(),
+        end=graphene.Date(),
+        description="Orders and revenue per day, read from the sales rollup"
+    )
+    top_customers = graphene.List(
+        CustomerSalesType,
+        first=graphene.Int(required=True, default_value=10),
+        description="Customers with the highest lifetime revenue (at most RELAY_CONNECTION_MAX_LIMIT)"
+    )
+    top_products = graphene.List(
+        ProductSalesType,
+        first=graphene.Int(required=True, default_value=10),
+        description="Products with the highest lifetime revenue (at most RELAY_CONNECTION_MAX_LIMIT)"
+    )
+
+    def resolve_daily_sales(self, info, start=None, end=None):
+        qs = DailySalesRollup.objects.order_by('day')
+        if start:
+            qs = qs.filter(day__gte=start)
+        if end:
+            qs = qs.filter(day__lte=end)
+        return alist(qs) if in_event_loop() else qs
+
+    def resolve_top_customers(self, info, first=10):
+        qs = optimize_queryset(
+            CustomerSalesRollup.objects.order_by('-revenue'), info, field_selections(info)
+        )[:top_limit(first)]
+        return alist(qs) if in_event_loop() else qs
+
+    def resolve_top_products(self, info, first=10):
+        qs = optimize_queryset(
+            ProductSalesRollup.objects.order_by('-revenue'), info, field_selections(info)
+        )[:top_limit(first)]
+        return alist(qs) if in_event_loop() else qs
+
     def resolve_customers(self, info, **kwargs):
-        qs = Customer.objects.all()
-        filterset = CustomerFilter(data=kwargs, queryset=qs, request=info.context)
-        return filterset.qs
+        # The connection field applies CustomerFilter to what this returns
+        return optimize_queryset(Customer.objects.all(), info)
 
     def resolve_products(self, info, **kwargs):
-        qs = Product.objects.all()
-        filterset = ProductFilter(data=kwargs, queryset=qs, request=info.context)
-        return filterset.qs
+        # The connection field applies ProductFilter to what this returns
+        return optimize_queryset(Product.objects.all(), info)
 
     def resolve_orders(self, info, **kwargs):
-        qs = Order.objects.all()
-        filterset = OrderFilter(data=kwargs, queryset=qs, request=info.context)
-        return filterset.qs
+        # The connection field applies OrderFilter to what this returns
+        return optimize_queryset(Order.objects.all(), info)
 
     # Resolvers with ordering support
     def resolve_all_customers(self, info, order_by=None, **kwargs):
-        qs = Customer.objects.all()
+        qs = optimize_queryset(Customer.objects.all(), info)
         if order_by:
             qs = qs.order_by(*order_by)
-        return CustomerFilter(data=kwargs, queryset=qs, request=info.context).qs
+        return qs
 
     def resolve_all_products(self, info, order_by=None, **kwargs):
-        qs = Product.objects.all()
+        qs = optimize_queryset(Product.objects.all(), info)
         if order_by:
             qs = qs.order_by(*order_by)
-        return ProductFilter(data=kwargs, queryset=qs).qs
+        return qs
 
     def resolve_all_orders(self, info, order_by=None, **kwargs):
-        qs = Order.objects.all()
+        qs = optimize_queryset(Order.objects.all(), info)
         if order_by:
             qs = qs.order_by(*order_by)
-        return OrderFilter(data=kwargs, queryset=qs).qs
+        return qs
+
+
+
+class Subscription(graphene.ObjectType):
+    """
+    Events pushed over the WebSocket endpoint (crm.consumers), published by
+    the mutations when their transaction commits.
+    """
+    order_created = graphene.Field(OrderType, description="Every newly created order")
+    product_stock_changed = graphene.Field(
+        ProductType,
+        below=graphene.Int(description="Only report products whose new stock is below this value"),
+        description="Products whose stock was changed by a restock"
+    )
+
+    async def subscribe_order_created(root, info):
+        async for event in listen(ORDER_CREATED):
+            orders = optimize_queryset(Order.objects.filter(pk__in=event['ids']), info, field_selections(info))
+            async for order in orders.order_by('order_date', 'pk'):
+                yield order
+
+    async def subscribe_product_stock_changed(root, info, below=None):
+        async for event in listen(PRODUCT_STOCK_CHANGED):
+            products = optimize_queryset(
+                Product.objects.filter(pk__in=event['ids']), info, field_selections(info)
+            ).order_by('stock', 'pk')
+            if below is not None:
+                products = products.filter(stock__lt=below)
+            async for product in products:
+                yield product
+
+    def resolve_order_created(root, info, **kwargs):
+        return root
 
+    def resolve_product_stock_changed(root, info, **kwargs):
+        return root
 
 
 # Mutation root
@@ -318,5 +709,7 @@ class Mutation(graphene.ObjectType):
     create_customer = CreateCustomer.Field()
     bulk_create_customers = BulkCreateCustomers.Field()
     create_product = CreateProduct.Field()
+    bulk_upsert_products = BulkUpsertProducts.Field()
     create_order = CreateOrder.Field()
+    bulk_create_orders = BulkCreateOrders.Field()
     update_low_stock_products=UpdateLowStockProducts.Field()
\ No newline at end of file
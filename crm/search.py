@@ -0,0 +1,316 @@
+import re
+from dataclasses import dataclass
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Customer, Product, OrderLine
+
+DEFAULTS = {
+    # Matches a search considers. Scoring is what costs time when a word
+    # occurs in most rows, so beyond this many matches only the first ones
+    # in index order are ranked and returned
+    'RANK_WINDOW': 10000,
+    # Rows written per statement when (re)indexing
+    'BATCH_SIZE': 1000,
+}
+
+# Words of a search beyond this are ignored
+MAX_TERMS = 8
+
+# Runs of letters and digits; the SQLite tokenizer and the PostgreSQL
+# documents below split text the same way
+WORD = re.compile(r'[^\W_]+')
+
+
+def search_settings():
+    return {**DEFAULTS, **getattr(settings, 'SEARCH_INDEX', {})}
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    """
+    Full-text index over some text columns of a model, kept in a side table
+    (created by migration 0007) with one row per indexed row, found by the
+    model's primary key. On SQLite it holds the text and feeds an FTS5
+    table through triggers; on PostgreSQL it holds a tsvector under a GIN
+    index.
+    """
+    model: type
+    table: str
+    columns: tuple
+
+    @property
+    def key(self):
+        return self.model._meta.pk.column
+
+    @property
+    def base_table(self):
+        return self.model._meta.db_table
+
+
+INDEXES = {
+    Customer: SearchIndex(Customer, 'crm_customer_search', ('name', 'email')),
+    Product: SearchIndex(Product, 'crm_product_search', ('name', 'sku')),
+}
+
+
+def terms(text):
+    """The lowercased words of a search, matched as prefixes of indexed words."""
+    return WORD.findall((text or '').lower())[:MAX_TERMS]
+
+
+class SQLiteSearch:
+    """
+    External-content FTS5 tables ranked by bm25. The primary key lives only
+    in the content table (unique, so rows are found by exact key) and never
+    reaches the tokenizer.
+    """
+    rank_ordering = 'search_rank'
+
+    @staticmethod
+    def query(index, words):
+        # Every word is quoted, so user input never reaches the FTS5 syntax
+        return ' AND '.join(f'"{word}"*' for word in words)
+
+    @staticmethod
+    def fts(index):
+        return f'{index.table}_fts'
+
+    def match_sql(self, index, words):
+        fts = self.fts(index)
+        return (
+            f'SELECT {index.key} FROM {index.table} WHERE id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH %s)',
+            [self.query(index, words)]
+        )
+
+    def rank(self, queryset, index, words, window):
+        fts = self.fts(index)
+        query = self.query(index, words)
+        return queryset.extra(
+            select={'search_rank': f'{fts}.rank'},
+            tables=[index.table, fts],
+            where=[
+                f'{index.table}.{index.key} = {index.base_table}.{index.key}',
+                f'{fts}.rowid = {index.table}.id',
+                f'{fts} MATCH %s',
+                # FTS5 walks matches in rowid order, so bounding the rowid by
+                # the window's last match makes it stop (and score) there
+                f'{fts}.rowid <= (SELECT max(rowid) FROM ('
+                f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s LIMIT %s))',
+            ],
+            params=[query, query, window],
+        )
+
+    def remove(self, cursor, index, values):
+        cursor.execute(
+            f'DELETE FROM {index.table} WHERE {index.key} IN ({", ".join(["%s"] * len(values))})',
+            values
+        )
+
+    def insert(self, cursor, index, values):
+        columns = ', '.join(index.columns)
+        cursor.execute(
+            f'INSERT INTO {index.table} ({index.key}, {columns}) '
+            f'SELECT {index.key}, {columns} FROM {index.base_table} '
+            f'WHERE {index.key} IN ({", ".join(["%s"] * len(values))})',
+            values
+        )
+
+    def save(self, cursor, index, values):
+        self.remove(cursor, index, values)
+        self.insert(cursor, index, values)
+
+    def clear(self, cursor, index):
+        cursor.execute(f'DELETE FROM {index.table}')
+
+    def optimize(self, cursor, index):
+        fts = self.fts(index)
+        cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+
+
+class PostgresSearch:
+    """tsvector documents with the 'simple' configuration, ranked by ts_rank."""
+    rank_ordering = '-search_rank'
+
+    @staticmethod
+    def query(index, words):
+        return ' & '.join(f'{word}:*' for word in words)
+
+    @staticmethod
+    def document(index):
+        # Punctuation becomes spaces so 'ada.lovelace@example.com' is four words
+        columns = ', '.join(
+            f"regexp_replace(coalesce({column}, ''), '[^[:alnum:]]+', ' ', 'g')" for column in index.columns
+        )
+        return f"to_tsvector('simple', concat_ws(' ', {columns}))"
+
+    def match_sql(self, index, words):
+        return (
+            f"SELECT {index.key} FROM {index.table} WHERE document @@ to_tsquery('simple', %s)",
+            [self.query(index, words)]
+        )
+
+    def rank(self, queryset, index, words, window):
+        query = self.query(index, words)
+        return queryset.extra(
+            select={'search_rank': f"ts_rank({index.table}.document, to_tsquery('simple', %s))"},
+            select_params=[query],
+            tables=[index.table],
+            where=[
+                f'{index.table}.{index.key} = {index.base_table}.{index.key}',
+                f"{index.table}.document @@ to_tsquery('simple', %s)",
+                f'{index.table}.{index.key} IN ('
+                f"SELECT {index.key} FROM {index.table} WHERE document @@ to_tsquery('simple', %s) LIMIT %s)",
+            ],
+            params=[query, query, window],
+        )
+
+    def remove(self, cursor, index, values):
+        cursor.execute(f'DELETE FROM {index.table} WHERE {index.key} = ANY(%s)', [list(values)])
+
+    def insert(self, cursor, index, values):
+        cursor.execute(
+            f'INSERT INTO {index.table} ({index.key}, document) '
+            f'SELECT {index.key}, {self.document(index)} FROM {index.base_table} '
+            f'WHERE {index.key} = ANY(%s) '
+            f'ON CONFLICT ({index.key}) DO UPDATE SET document = EXCLUDED.document',
+            [list(values)]
+        )
+
+    save = insert
+
+    def clear(self, cursor, index):
+        cursor.execute(f'DELETE FROM {index.table}')
+
+    def optimize(self, cursor, index):
+        cursor.execute(f'ANALYZE {index.table}')
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearch(),
+    'postgresql': PostgresSearch(),
+}
+
+
+def backend(using):
+    """The full-text backend of a database alias, or None (icontains fallback)."""
+    return BACKENDS.get(connections[using].vendor)
+
+
+def _contains(index, words):
+    # Databases without a full-text index get the old icontains scan
+    condition = Q()
+    for word in words:
+        term = Q()
+        for column in index.columns:
+            term |= Q(**{f'{column}__icontains': word})
+        condition &= term
+    return condition
+
+
+def matching(model, text, using=None):
+    """
+    Subquery of the primary keys of `model` rows matching every word of
+    `text`, for `__in` lookups. Runs on whichever database the outer
+    queryset reads from.
+    """
+    index = INDEXES[model]
+    words = terms(text)
+    using = using or router.db_for_read(model)
+    search = backend(using)
+    if search is None:
+        return model.objects.filter(_contains(index, words)).values('pk')
+    sql, params = search.match_sql(index, words)
+    return RawSQL(sql, params)
+
+
+def search(queryset, text):
+    """
+    Narrow `queryset` to the rows matching every word of `text` (as word
+    prefixes) and, unless it is already explicitly ordered, sort it by
+    relevance. The search is a join on the index, so nothing is read until
+    the queryset is; at most RANK_WINDOW matches are returned, paged with
+    offset cursors.
+    """
+    index = INDEXES[queryset.model]
+    words = terms(text)
+    if not words:
+        return queryset.none()
+    search = backend(queryset.db)
+    if search is None:
+        return queryset.filter(_contains(index, words))
+    ordered = bool(queryset.query.order_by)
+    queryset = search.rank(queryset, index, words, search_settings()['RANK_WINDOW'])
+    if not ordered:
+        queryset = queryset.order_by(search.rank_ordering, 'pk')
+    return queryset
+
+
+def search_orders(queryset, text):
+    """Narrow `queryset` to orders whose customer or one of whose products match `text`."""
+    if not terms(text):
+        return queryset.none()
+    using = queryset.db
+    return queryset.filter(
+        Q(customer__in=matching(Customer, text, using=using))
+        | Q(pk__in=OrderLine.objects.filter(product__in=matching(Product, text, using=using)).values('order'))
+    )
+
+
+def _write(model, pks, using, operation):
+    index = INDEXES[model]
+    using = using or router.db_for_write(model)
+    search = backend(using)
+    if search is None:
+        return
+    connection = connections[using]
+    field = model._meta.pk
+    batch_size = search_settings()['BATCH_SIZE']
+    pks = iter(pks)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        while batch := list(islice(pks, batch_size)):
+            getattr(search, operation)(cursor, index, [field.get_db_prep_value(pk, connection) for pk in batch])
+
+
+def index_objects(model, pks, using=None):
+    """
+    (Re)index the given rows. The post_save signal covers save(); callers
+    of bulk_create()/bulk_update() and update() on indexed columns call
+    this themselves.
+    """
+    _write(model, pks, using, 'save')
+
+
+def remove_objects(model, pks, using=None):
+    """Drop the given rows from the index (post_delete does this for delete())."""
+    _write(model, pks, using, 'remove')
+
+
+def rebuild_index(models=None, using=None, batch_size=None):
+    """
+    Re-create the index of every row of `models` (all indexed models by
+    default) in one transaction per model. Returns {model: rows indexed}.
+    """
+    counts = {}
+    batch_size = batch_size or search_settings()['BATCH_SIZE']
+    for model in models or INDEXES:
+        index = INDEXES[model]
+        alias = using or router.db_for_write(model)
+        search = backend(alias)
+        if search is None:
+            continue
+        connection = connections[alias]
+        field = model._meta.pk
+        pks = model.objects.using(alias).order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+        counts[model] = 0
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            search.clear(cursor, index)
+            while batch := list(islice(pks, batch_size)):
+                search.insert(cursor, index, [field.get_db_prep_value(pk, connection) for pk in batch])
+                counts[model] += len(batch)
+            search.optimize(cursor, index)
+    return counts
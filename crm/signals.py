@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import response_cache
+from .models import (
+    Customer,
+    Product,
+    Order
+)
+from .search import INDEXES, index_objects, remove_objects
+
+_muted = ContextVar('crm_signals_muted', default=False)
+
+
+@contextmanager
+def muted_receivers():
+    """
+    Skip the per-row receivers below inside the block, for bulk writes that
+    invalidate the response cache and update the search index once
+    themselves instead of once per row.
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Order)
+def invalidate_response_cache(sender, **kwargs):
+    if not _muted.get():
+        response_cache.invalidate(sender)
+
+
+@receiver(m2m_changed, sender=Order.product.through)
+def invalidate_order_products(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        response_cache.invalidate(Order, Product)
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, using, update_fields=None, **kwargs):
+    if _muted.get():
+        return
+    # save(update_fields=['stock']) and the like leave the indexed text alone
+    if update_fields is None or not update_fields.isdisjoint(INDEXES[sender].columns):
+        index_objects(sender, [instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    if not _muted.get():
+        remove_objects(sender, [instance.pk], using=using)
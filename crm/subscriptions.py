@@ -0,0 +1,44 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+ORDER_CREATED = "crm.order_created"
+PRODUCT_STOCK_CHANGED = "crm.product_stock_changed"
+
+
+def publish(group, **payload):
+    """
+    Broadcast an event to the subscribers of `group` once the current
+    transaction commits. Payload values must be plain (msgpack-able) data.
+    """
+    def send():
+        layer = get_channel_layer()
+        if layer is not None:
+            async_to_sync(layer.group_send)(group, {"type": "crm.event", "payload": payload})
+    transaction.on_commit(send)
+
+
+def publish_order_created(order_ids):
+    if order_ids:
+        publish(ORDER_CREATED, ids=[str(pk) for pk in order_ids])
+
+
+def publish_stock_changed(product_ids):
+    if product_ids:
+        publish(PRODUCT_STOCK_CHANGED, ids=[str(pk) for pk in product_ids])
+
+
+async def listen(group):
+    """
+    Async generator over the payloads sent to `group`, for the lifetime of
+    one subscription.
+    """
+    layer = get_channel_layer()
+    channel = await layer.new_channel()
+    await layer.group_add(group, channel)
+    try:
+        while True:
+            message = await layer.receive(channel)
+            yield message["payload"]
+    finally:
+        await layer.group_discard(group, channel)
@@ -1,78 +1,131 @@
+import logging
+from datetime import date, timedelta
+
 from celery import shared_task
-from gql import Client, gql
-from gql.transport.requests import RequestsHTTPTransport
-from datetime import datetime, date
-import os
+from django.utils import timezone
+
+from .chunks import fan_out
+from .maintenance import (
+    cleanup_range,
+    log_restock,
+    merge_report,
+    merge_restock,
+    report_range,
+    restock_range
+)
+from .models import (
+    Customer,
+    Product,
+    Order
+)
+from .reminders import send_order_reminders
+from .replicas import use_replica
+from .reports import claim_report_run, release_report_run, write_crm_report
+
+logger = logging.getLogger(__name__)
 
+CHUNK_RETRY = {"autoretry_for": (Exception,), "retry_backoff": 30, "retry_kwargs": {"max_retries": 3}}
 
 
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=30, retry_kwargs={"max_retries": 3})
-def generate_crm_report():
-    transport=RequestsHTTPTransport(
-        url='http://localhost:8000/graphql/',
-    )
-
-    client=Client(
-        transport=transport
-    )
-
-    LOG_PATH="/tmp/crm_report_log.txt"
-    timestamp = datetime.now().isoformat()
-    customer_count = 0
-    total_orders = 0
-    total_revenue = 0
-
-    today = date.today().isoformat()
-    if os.path.exists(LOG_PATH):
-        with open(LOG_PATH, "r") as f:
-            if any(today in line for line in f):
-                print("CRM report already generated for today.")
-                return
-
-    customers_query=gql(
-        """
-        query{
-            allCustomers{
-                edges{
-                    node{
-                    }
-                }
-            }
-        }
-    """
-    )
-
-    orders_query=gql(
-        """
-        query{
-            allOrders{
-                edges{
-                    node{
-                    total_amount
-                    }
-                }
-            }
-        }
-    """
-    )
-
-    customers_payload=client.execute(
-        customers_query
-    )
-
-    orders_payload=client.execute(
-        orders_query
-    )
-
-    for _ in customers_payload.get("allCustomers", {}).get("edges", {}):
-        customer_count+=1
-
-    
-    for edge in orders_payload.get("allOrders", {}).get("edges", {}):
-        total_orders+=1
-        total_revenue+=edge.get("node", {}).get("total_amount")
-    
-    with open(LOG_PATH, "a") as log_file:
-        log_file.write(
-            f"{timestamp} - Report: {customer_count} customers, \
-                {total_orders}, {total_revenue} revenue")
+def generate_crm_report(self, period_days=7, chunk_size=None):
+    today = timezone.localdate()
+    if not claim_report_run(today):
+        logger.info("CRM report already generated for %s", today)
+        return None
+
+    now = timezone.now()
+    try:
+        # Reporting reads from the replica (crm.replicas), chunk boundaries included
+        with use_replica():
+            result = fan_out(
+                crm_report_chunk,
+                Order.objects.all(),
+                finish_crm_report.s(
+                    since=(now - timedelta(days=period_days)).isoformat(),
+                    until=now.isoformat(),
+                    period_days=period_days,
+                    day=today.isoformat(),
+                ).on_error(release_crm_report_run.si(today.isoformat())),
+                chunk_size=chunk_size,
+                since=(now - timedelta(days=period_days)).isoformat(),
+                until=now.isoformat(),
+            )
+    except Exception:
+        # Let the retry run instead of being skipped as a duplicate
+        release_report_run(today)
+        raise
+    return result.id
+
+
+@shared_task(**CHUNK_RETRY)
+def crm_report_chunk(first, last, since, until):
+    with use_replica():
+        return report_range(first, last, since, until)
+
+
+@shared_task
+def finish_crm_report(parts, since, until, period_days, day):
+    with use_replica():
+        report = merge_report(parts, since, until, period_days)
+    write_crm_report(report, date.fromisoformat(day))
+    return report
+
+
+@shared_task
+def release_crm_report_run(day):
+    release_report_run(date.fromisoformat(day))
+
+
+@shared_task
+def restock_low_stock(threshold=10, amount=10, chunk_size=None):
+    """Restock low-stock products in parallel PK-range chunks."""
+    return fan_out(
+        restock_chunk,
+        Product.objects.filter(stock__lt=threshold),
+        finish_restock.s(),
+        chunk_size=chunk_size,
+        threshold=threshold,
+        amount=amount,
+    ).id
+
+
+@shared_task(**CHUNK_RETRY)
+def restock_chunk(first, last, threshold=10, amount=10):
+    return restock_range(first, last, threshold=threshold, amount=amount)
+
+
+@shared_task
+def finish_restock(parts):
+    result = merge_restock(parts)
+    log_restock(result)
+    return result
+
+
+@shared_task
+def cleanup_inactive_customers(days=365, dry_run=False, chunk_size=None):
+    """Delete inactive customers in parallel PK-range chunks."""
+    return fan_out(
+        cleanup_chunk,
+        Customer.objects.all(),
+        sum_results.s(),
+        chunk_size=chunk_size,
+        cutoff=(timezone.now() - timedelta(days=days)).isoformat(),
+        dry_run=dry_run,
+    ).id
+
+
+@shared_task(**CHUNK_RETRY)
+def cleanup_chunk(first, last, cutoff, dry_run=False):
+    return cleanup_range(first, last, cutoff, dry_run=dry_run)
+
+
+@shared_task
+def sum_results(parts):
+    return sum(parts)
+
+
+@shared_task
+def send_order_reminders_task(days=None):
+    sent, orders = send_order_reminders(days=days)
+    return {'customers': sent, 'orders': orders}
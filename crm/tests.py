@@ -1,3 +1,967 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import views
+from .cache import response_cache
+from .models import Customer, Product, Order, OrderLine
+from .rollups import rebuild_rollups
+
+
+def create_order(customer, *products):
+    """An order with one unit of each product, without touching stock."""
+    order = Order.objects.create(customer=customer, total_amount=sum(p.price for p in products))
+    OrderLine.objects.bulk_create([
+        OrderLine(order=order, product=p, quantity=1, unit_price=p.price, line_total=p.price)
+        for p in products
+    ])
+    return order
+
+
+class GraphQLTestCase(TestCase):
+    endpoint = '/graphql/'
+
+    def query(self, query, variables=None, endpoint=None, **headers):
+        response = self.client.post(
+            endpoint or self.endpoint,
+            {'query': query, 'variables': variables or {}},
+            content_type='application/json',
+            headers=headers,
+        )
+        return response.json()
+
+    async def aquery(self, query, variables=None):
+        response = await AsyncClient().post(
+            '/graphql/async/',
+            {'query': query, 'variables': variables or {}},
+            content_type='application/json',
+        )
+        return response.json()
+
+
+class OptimizerTests(GraphQLTestCase):
+    QUERY = '{ customers { edges { node { name salesRollup { revenue orderCount } } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        ada = Customer.objects.create(name='Ada', email='ada@example.com')
+        Customer.objects.create(name='Bob', email='bob@example.com')
+        engine = Product.objects.create(name='Engine', price=Decimal('12.50'), stock=5)
+        create_order(ada, engine)
+        rebuild_rollups()
+
+    def check_rollups(self, result):
+        self.assertNotIn('errors', result)
+        rollups = {e['node']['name']: e['node']['salesRollup'] for e in result['data']['customers']['edges']}
+        self.assertEqual(rollups, {'Ada': {'revenue': '12.50', 'orderCount': 1}, 'Bob': None})
+
+    def test_reverse_one_to_one_is_joined(self):
+        with self.assertNumQueries(1):
+            result = self.query(self.QUERY)
+        self.check_rollups(result)
+
+    async def test_reverse_one_to_one_async(self):
+        self.check_rollups(await self.aquery(self.QUERY))
+
+
+class LoaderTests(GraphQLTestCase):
+    """Nested lookups cost one query per nesting level, whatever the list size."""
+
+    QUERY = '''
+        query ($first: Int) { orders(first: $first) { edges { node {
+            customer { name purchases { edges { node { totalAmount } } } }
+            product { edges { node { name } } }
+            lines { quantity product { name } }
+        } } } }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        products = [Product.objects.create(name=f'P{i}', price=Decimal('1.00'), stock=1) for i in range(4)]
+        for i in range(30):
+            customer = Customer.objects.create(name=f'C{i}', email=f'c{i}@example.com')
+            order = create_order(customer, *products[:i % 4 + 1])
+            order.product.set(products[:i % 4 + 1])
+
+    def count_queries(self, run):
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        return len(queries)
+
+    def test_graphql_query_count_is_constant(self):
+        def run(first):
+            result = self.query(self.QUERY, {'first': first})
+            self.assertEqual(len(result['data']['orders']['edges']), first)
+
+        self.assertEqual(self.count_queries(lambda: run(3)), self.count_queries(lambda: run(30)))
+
+    def test_loaders_batch_each_level(self):
+        from .loaders import CRMLoaders
+
+        def run(size):
+            loaders = CRMLoaders()
+            orders = list(Order.objects.order_by('pk')[:size])
+            loaders.prime(orders)
+            for order in orders:
+                loaders.orders_by_customer.load(loaders.customer_by_id.load(order.customer_id).pk)
+                for product in loaders.products_by_order.load(order.pk):
+                    loaders.orders_by_product.load(product.pk)
+
+        # The orders, then one query each for customers, products and both reverse lookups
+        self.assertEqual(self.count_queries(lambda: run(3)), 5)
+        self.assertEqual(self.count_queries(lambda: run(30)), 5)
+
+
+class SearchTests(GraphQLTestCase):
+    QUERY = '''
+        query ($search: String) {
+            customers(search: $search) { edges { node { name } } }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Customer.objects.create(name='Ada Lovelace', email='ada@example.com')
+        Customer.objects.create(name='Adam Smith', email='smith@example.com')
+        Customer.objects.create(name='Alan Turing', email='alan@example.com')
+
+    def names(self, result):
+        self.assertNotIn('errors', result)
+        return [e['node']['name'] for e in result['data']['customers']['edges']]
+
+    def test_matches_word_prefixes_best_first(self):
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': 'ada'})), ['Ada Lovelace', 'Adam Smith'])
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': 'ada love'})), ['Ada Lovelace'])
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': '"* NEAR('})), [])
+
+    def test_ranking_is_part_of_the_page_query(self):
+        # The offset pagination's COUNT and the page itself; nothing is read
+        # while the filter is built, and it is applied once
+        with self.assertNumQueries(2):
+            self.query(self.QUERY, {'search': 'ada'})
+
+    async def test_async_view(self):
+        self.assertEqual(self.names(await self.aquery(self.QUERY, {'search': 'turing'})), ['Alan Turing'])
+
+    def test_keys_are_not_searchable(self):
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': self.ada.pk.hex[:8]})), [])
+
+    def test_index_follows_saves(self):
+        self.ada.name = 'Augusta King'
+        self.ada.save()
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': 'augusta'})), ['Augusta King'])
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': 'lovelace'})), [])
+        self.ada.delete()
+        self.assertEqual(self.names(self.query(self.QUERY, {'search': 'augusta'})), [])
+
+    def test_orders_search_customers_and_products(self):
+        engine = Product.objects.create(name='Analytical Engine', price=Decimal('1.00'), stock=1)
+        create_order(self.ada, engine)
+        query = '{ orders(search: "%s") { edges { node { customer { name } } } } }'
+        for term in ('analytical', 'lovelace'):
+            result = self.query(query % term)
+            self.assertEqual(
+                [e['node']['customer']['name'] for e in result['data']['orders']['edges']], ['Ada Lovelace']
+            )
+
+
+class CustomerCleanupTests(TestCase):
+    def test_bulk_delete_updates_index_and_cache_once(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .maintenance import delete_inactive_customers
+        from .search import search
+
+        customers = [Customer.objects.create(name=f'Old {i}', email=f'old{i}@example.com') for i in range(20)]
+        engine = Product.objects.create(name='Engine', price=Decimal('1.00'), stock=1)
+        for customer in customers:
+            create_order(customer, engine)
+        Order.objects.update(order_date=timezone.now() - timedelta(days=400))
+        pks = [customer.pk for customer in customers]
+
+        with self.captureOnCommitCallbacks() as callbacks, CaptureQueriesContext(connection) as queries:
+            self.assertEqual(delete_inactive_customers(pks, timezone.now() - timedelta(days=365)), 20)
+        # One index DELETE and one cache invalidation for the whole chunk
+        self.assertEqual(sum('crm_customer_search' in q['sql'] for q in queries.captured_queries), 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(search(Customer.objects.all(), 'old').exists())
+
+
+class ChunkedMaintenanceTests(TestCase):
+    """The chunked jobs give the same result as a single sequential pass."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        products = [
+            Product.objects.create(name=f'P{i}', price=Decimal(i + 1), stock=i * 3) for i in range(7)
+        ]
+        for i in range(9):
+            customer = Customer.objects.create(name=f'C{i}', email=f'c{i}@example.com')
+            if i % 3:
+                create_order(customer, *products[:i % 4 + 1])
+        # Every third order is out of the report period and makes its customer inactive
+        for i, order in enumerate(Order.objects.order_by('pk')):
+            if i % 3 == 0:
+                Order.objects.filter(pk=order.pk).update(order_date=timezone.now() - timedelta(days=400))
+
+    def run_job(self, job, queryset, chunk_size, rollback=False, **kwargs):
+        from django.db import transaction
+        from .chunks import pk_ranges
+
+        with transaction.atomic():
+            parts = [job(first, last, **kwargs) for first, last in pk_ranges(queryset, chunk_size)]
+            transaction.set_rollback(rollback)
+        return parts
+
+    def test_restock(self):
+        from .maintenance import merge_restock, restock_range
+
+        chunked = merge_restock(self.run_job(restock_range, Product.objects.all(), 2, rollback=True))
+        sequential = merge_restock(self.run_job(restock_range, Product.objects.all(), 100))
+        self.assertEqual(chunked['updated_count'], 4)
+        self.assertEqual(chunked['updated_count'], sequential['updated_count'])
+        self.assertEqual(sorted(chunked['products']), sequential['products'])
+
+    def test_cleanup(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .maintenance import cleanup_range
+
+        cutoff = timezone.now() - timedelta(days=365)
+        chunked = self.run_job(cleanup_range, Customer.objects.all(), 2, rollback=True, cutoff=cutoff)
+        self.assertEqual(len(chunked), 5)
+        sequential = self.run_job(cleanup_range, Customer.objects.all(), 100, cutoff=cutoff)
+        self.assertGreater(sum(chunked), 0)
+        self.assertEqual(sum(chunked), sum(sequential))
+
+    def test_report(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .maintenance import merge_report, report_range
+
+        now = timezone.now()
+        period = {'since': (now - timedelta(days=7)).isoformat(), 'until': now.isoformat()}
+        chunked = self.run_job(report_range, Order.objects.all(), 2, **period)
+        sequential = self.run_job(report_range, Order.objects.all(), 100, **period)
+        report = merge_report(chunked, period_days=7, **period)
+        self.assertEqual(report, merge_report(sequential, period_days=7, **period))
+        recent = Order.objects.filter(order_date__gte=period['since'])
+        self.assertEqual(report['totals']['orders'], Order.objects.count())
+        self.assertEqual(report['period_totals']['orders'], recent.count())
+        self.assertEqual(
+            sum(row['orders'] for row in report['per_product']),
+            OrderLine.objects.filter(order__in=recent).count()
+        )
+
+
+class PersistedQueryTests(GraphQLTestCase):
+    QUERY = '{ customers { edges { node { name } } } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        Customer.objects.create(name='Ada', email='ada@example.com')
+
+    def setUp(self):
+        from django.core.cache import caches
+
+        caches['default'].clear()
+        views.document_cache.clear()
+
+    def persisted(self, sha, query=None, version=1):
+        data = {'extensions': {'persistedQuery': {'version': version, 'sha256Hash': sha}}}
+        if query is not None:
+            data['query'] = query
+        return self.client.post(self.endpoint, data, content_type='application/json').json()
+
+    def error_code(self, result):
+        return result['errors'][0]['extensions']['code']
+
+    def test_unknown_hash_is_registered_with_the_query(self):
+        sha = views.query_hash(self.QUERY)
+        self.assertEqual(self.error_code(self.persisted(sha)), 'PERSISTED_QUERY_NOT_FOUND')
+        expected = {'customers': {'edges': [{'node': {'name': 'Ada'}}]}}
+        self.assertEqual(self.persisted(sha, self.QUERY)['data'], expected)
+        self.assertEqual(self.persisted(sha)['data'], expected)
+
+    def test_hash_mismatch_is_not_registered(self):
+        sha = '0' * 64
+        self.assertEqual(self.error_code(self.persisted(sha, self.QUERY)), 'PERSISTED_QUERY_HASH_MISMATCH')
+        self.assertEqual(self.error_code(self.persisted(sha)), 'PERSISTED_QUERY_NOT_FOUND')
+
+    def test_unsupported_version(self):
+        result = self.persisted(views.query_hash(self.QUERY), self.QUERY, version=2)
+        self.assertEqual(self.error_code(result), 'PERSISTED_QUERY_VERSION_NOT_SUPPORTED')
+
+    def test_documents_are_parsed_once(self):
+        with mock.patch.object(views, 'parse', wraps=views.parse) as parse:
+            self.query(self.QUERY)
+            self.query(self.QUERY)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual((views.document_cache.hits, views.document_cache.misses), (1, 1))
+
+    def test_document_cache_evicts_least_recently_used(self):
+        cache = views.DocumentCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c'), len(cache)), (1, 3, 2))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+
+@override_settings(GRAPHQL_RESPONSE_CACHE={'ENABLED': True})
+class ResponseCacheTests(GraphQLTestCase):
+    QUERY = '{ customers { edges { node { name } } } }'
+
+    def setUp(self):
+        response_cache.cache.clear()
+        response_cache.reset_stats()
+
+    def names(self):
+        result = self.query(self.QUERY)
+        return sorted(e['node']['name'] for e in result['data']['customers']['edges'])
+
+    def test_writes_invalidate_cached_results(self):
+        Customer.objects.create(name='Ada', email='ada@example.com')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.names(), ['Ada'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names(), ['Ada'])
+        self.assertEqual(response_cache.stats(), {'hits': 1, 'misses': 1})
+        metrics = self.client.get('/metrics/').content.decode()
+        self.assertIn('graphql_response_cache_requests_total{result="hit"} 1\n', metrics)
+        self.assertIn('graphql_response_cache_requests_total{result="miss"} 1\n', metrics)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.query('''mutation {
+                createCustomer(input: {name: "Bob", email: "bob@example.com", phone: "+1234567890"}) { message }
+            }''')
+        self.assertEqual(self.names(), ['Ada', 'Bob'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.filter(name='Ada').get().delete()
+        self.assertEqual(self.names(), ['Bob'])
+
+    def test_misses_are_filled_from_the_primary(self):
+        with mock.patch.object(views, 'use_replica', wraps=views.use_replica) as use_replica:
+            self.query(self.QUERY)
+            self.query('{ orders { edges { node { totalAmount } } } }')
+        self.assertEqual([c.args for c in use_replica.call_args_list], [(False,), (True,)])
+
+
+class OrderRemindersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import timedelta
+        from django.utils import timezone
+
+        engine = Product.objects.create(name='Engine', price=Decimal('1.00'), stock=1)
+        ada = Customer.objects.create(name='Ada', email='ada@example.com')
+        bob = Customer.objects.create(name='Bob', email='bob@example.com')
+        old = Customer.objects.create(name='Old', email='old@example.com')
+        cls.ada_orders = [create_order(ada, engine) for _ in range(2)]
+        Order.objects.filter(pk=cls.ada_orders[0].pk).update(order_date=timezone.now() - timedelta(days=1))
+        create_order(bob, engine)
+        expired = create_order(old, engine)
+        Order.objects.filter(pk=expired.pk).update(order_date=timezone.now() - timedelta(days=30))
+
+    def test_one_reminder_per_customer(self):
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'reminders.log')
+            stderr = StringIO()
+            with override_settings(ORDER_REMINDERS={'OPTIONS': {'path': path}}):
+                call_command('send_order_reminders', batch_size=1, stderr=stderr)
+            with open(path) as f:
+                lines = f.read().splitlines()
+
+        self.assertEqual(len(lines), 2)
+        ada = next(line for line in lines if 'ada@example.com' in line)
+        # Newest order first
+        newest, older = self.ada_orders[1].pk, self.ada_orders[0].pk
+        self.assertIn(f'Order ID: {newest}, {older}, Customer Email: ada@example.com', ada)
+        self.assertIn('2 customer(s), 3 order(s)', stderr.getvalue())
+
+    def test_invalid_backend(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with self.assertRaisesMessage(CommandError, 'Invalid reminder backend'):
+            call_command('send_order_reminders', backend='crm.reminders.MissingBackend')
+
+
+class PlaceOrdersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Customer.objects.create(name='Ada', email='ada@example.com')
+        cls.bob = Customer.objects.create(name='Bob', email='bob@example.com')
+        cls.engine = Product.objects.create(name='Engine', price=Decimal('10.00'), stock=5)
+
+    def place(self, *quantities):
+        from .orders import place_orders
+
+        rows = [
+            (customer.pk, [(self.engine.pk, quantity)])
+            for customer, quantity in zip([self.ada, self.bob] * len(quantities), quantities)
+        ]
+        return list(place_orders(rows))
+
+    def assert_stock_left(self, stock):
+        self.engine.refresh_from_db()
+        self.assertEqual(self.engine.stock, stock)
+
+    def test_stock_is_handed_out_in_input_order(self):
+        first, second = self.place(3, 3)
+        self.assertTrue(first.ok)
+        self.assertFalse(second.ok)
+        self.assertEqual(
+            [(e.line, e.message, e.requested, e.available) for e in second.errors],
+            [(0, 'Insufficient stock', 3, 2)]
+        )
+        self.assert_stock_left(2)
+
+    def test_stock_taken_concurrently_rejects_lines_not_the_chunk(self):
+        from . import orders
+
+        allocate = orders._allocate
+
+        def before_another_order(*args):
+            # Another order commits between this chunk's read and its write
+            if allocated.call_count == 1:
+                Product.objects.filter(pk=self.engine.pk).update(stock=3)
+            return allocate(*args)
+
+        with mock.patch.object(orders, '_allocate', side_effect=before_another_order) as allocated:
+            first, second = self.place(2, 2)
+        self.assertTrue(first.ok)
+        self.assertEqual([(e.message, e.available) for e in second.errors], [('Insufficient stock', 1)])
+        self.assert_stock_left(1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_rollups_are_updated_for_every_customer(self):
+        from .models import CustomerSalesRollup
+
+        results = self.place(1, 2, 1)
+        self.assertTrue(all(result.ok for result in results))
+        rollups = {
+            rollup.customer_id: (rollup.order_count, rollup.revenue, rollup.last_order_date)
+            for rollup in CustomerSalesRollup.objects.all()
+        }
+        orders = Order.objects.order_by('order_date')
+        self.assertEqual(rollups, {
+            self.ada.pk: (2, Decimal('20.00'), orders.filter(customer=self.ada).last().order_date),
+            self.bob.pk: (1, Decimal('20.00'), orders.filter(customer=self.bob).last().order_date),
+        })
+
+
+class SubscriptionTests(GraphQLTestCase):
+    CREATE = '''
+        mutation ($input: OrderInput!) { createOrder(input: $input) { order { totalAmount } } }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Customer.objects.create(name='Ada', email='ada@example.com')
+        cls.engine = Product.objects.create(name='Engine', price=Decimal('10.00'), stock=3)
+
+    def create_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.query(self.CREATE, {'input': {
+                'customerId': str(self.ada.pk),
+                'lines': [{'productId': str(self.engine.pk), 'quantity': 2}],
+            }})
+
+    async def subscribe(self, query):
+        """An acknowledged graphql-transport-ws connection with `query` subscribed as id 1."""
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from .routing import websocket_urlpatterns
+
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), '/graphql/', subprotocols=['graphql-transport-ws']
+        )
+        self.assertEqual(await communicator.connect(), (True, 'graphql-transport-ws'))
+        await communicator.send_json_to({'type': 'connection_init'})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'connection_ack'})
+        await communicator.send_json_to({'id': '1', 'type': 'subscribe', 'payload': {'query': query}})
+        return communicator
+
+    async def test_order_created_is_pushed_on_commit(self):
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from channels.layers import get_channel_layer
+        from .subscriptions import ORDER_CREATED
+
+        communicator = await self.subscribe('subscription { orderCreated { customer { name } totalAmount } }')
+        # Wait until the subscription listens on its group
+        groups = get_channel_layer().groups
+        for _ in range(100):
+            if ORDER_CREATED in groups:
+                break
+            await asyncio.sleep(0.01)
+        await sync_to_async(self.create_order)()
+        message = await communicator.receive_json_from(timeout=5)
+        self.assertEqual(message, {'id': '1', 'type': 'next', 'payload': {
+            'data': {'orderCreated': {'customer': {'name': 'Ada'}, 'totalAmount': '20.00'}}
+        }})
+        await communicator.send_json_to({'id': '1', 'type': 'complete'})
+        await communicator.disconnect()
+
+    async def test_queries_are_refused(self):
+        communicator = await self.subscribe('{ customers { totalCount } }')
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'error')
+        self.assertEqual(message['payload'][0]['message'], 'Only subscription operations are served over WebSocket.')
+        await communicator.disconnect()
+
+class MetricsTests(GraphQLTestCase):
+    def setUp(self):
+        from .instrumentation import metrics
+
+        self.metrics = metrics
+        metrics.reset()
+
+    @override_settings(GRAPHQL_METRICS={'MAX_OPERATIONS': 2})
+    def test_operation_labels_are_bounded(self):
+        for name in ('First', 'Second', 'Third'):
+            self.query(f'query {name} {{ customers {{ edges {{ node {{ name }} }} }} }}')
+        self.query('{ customers { edges { node { name } } } }')
+        self.assertEqual(
+            sorted(self.metrics.requests),
+            [('First', 'ok'), ('Second', 'ok'), ('anonymous', 'ok')]
+        )
+        self.assertEqual(self.metrics.requests[('anonymous', 'ok')], 2)
+
+    @override_settings(GRAPHQL_METRICS={'OPERATIONS': ['Known']})
+    def test_unknown_operations_are_anonymous(self):
+        self.query('query Known { customers { edges { node { name } } } }')
+        self.query('query Unknown { customers { edges { node { name } } } }')
+        self.assertEqual(sorted(self.metrics.requests), [('Known', 'ok'), ('anonymous', 'ok')])
+
+    def test_resolvers_are_timed_only_when_profiled(self):
+        query = '{ customers { edges { node { name } } } }'
+        self.query(query)
+        self.assertEqual(dict(self.metrics.resolvers), {})
+        result = self.query(query, **{'X-GraphQL-Profile': '1'})
+        self.assertIn('customers', [r['path'] for r in result['extensions']['profile']['resolvers']])
+        self.assertIn('Query.customers', self.metrics.resolvers)
+
+
+    @override_settings(GRAPHQL_METRICS={'MAX_OPERATIONS': 1})
+    def test_render(self):
+        from .instrumentation import _label
+
+        self.query('query First { customers { edges { node { name } } } }', **{'X-GraphQL-Profile': '1'})
+        self.query('query Second { customers { edges { node { name } } } }')
+        response = self.client.get('/metrics/')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        for line in (
+            '# TYPE graphql_requests_total counter',
+            'graphql_requests_total{operation="First",status="ok"} 1',
+            'graphql_requests_total{operation="anonymous",status="ok"} 1',
+            '# TYPE graphql_request_duration_seconds histogram',
+            'graphql_request_duration_seconds_bucket{operation="First",le="+Inf"} 1',
+            'graphql_request_duration_seconds_count{operation="anonymous"} 1',
+            'graphql_resolver_calls_total{field="Query.customers"} 1',
+        ):
+            self.assertIn(line, lines)
+        self.assertNotIn('Second', response.content.decode())
+        self.assertEqual(_label('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+
+class QueryCostTests(GraphQLTestCase):
+    NESTED = '''{
+        customers%s { edges { node { name
+            purchases%s { edges { node { totalAmount
+                product%s { edges { node { name } } }
+            } } }
+        } } }
+    }'''
+
+    def cost(self, result):
+        return result['extensions']['cost']['cost']
+
+    def test_nested_connections_without_page_sizes_pass(self):
+        result = self.query(self.NESTED % ('', '', ''))
+        self.assertNotIn('errors', result)
+        # 100 customers x (name + 10 purchases x (total + 10 products))
+        self.assertEqual(self.cost(result), 1 + 100 * (1 + 1 + 10 * (1 + 1 + 10 * 1)))
+
+    def test_explicit_page_sizes_are_charged(self):
+        result = self.query(self.NESTED % ('(first: 100)', '(first: 100)', '(first: 100)'))
+        self.assertEqual(result['errors'][0]['extensions']['code'], 'QUERY_TOO_COSTLY')
+        self.assertNotIn('data', result)
+
+    def test_empty_page_costs_nothing_below_it(self):
+        result = self.query('query ($n: Int) { customers(first: $n) { edges { node { name } } } }', {'n': 0})
+        self.assertEqual(self.cost(result), 1)
+
+
+class ExportViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        from django.contrib.auth.models import User
+
+        Customer.objects.create(name='Ada', email='ada@example.com', phone='+1234567890')
+        cls.user = User.objects.create_user('user')
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+
+    def test_requires_staff(self):
+        self.assertEqual(self.client.get('/export/customers/').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/export/customers/').status_code, 403)
+
+    def test_streams_to_staff(self):
+        self.client.force_login(self.staff)
+        response = self.client.get('/export/customers/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ada@example.com', b''.join(response.streaming_content).decode())
+
+
+class KeysetPaginationTests(GraphQLTestCase):
+    QUERY = '''
+        query ($first: Int, $last: Int, $after: String, $before: String, $orderingBy: String) {
+            products(first: $first, last: $last, after: $after, before: $before, orderingBy: $orderingBy) {
+                edges { cursor node { name } }
+                pageInfo { hasNextPage hasPreviousPage }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            Product.objects.create(name=f'P{i}', price=Decimal('1.00'), stock=i)
+
+    def page(self, **variables):
+        result = self.query(self.QUERY, variables)
+        self.assertNotIn('errors', result)
+        products = result['data']['products']
+        edges = products['edges']
+        return [e['node']['name'] for e in edges], [e['cursor'] for e in edges], products['pageInfo']
+
+    def test_after_and_before(self):
+        names, cursors, info = self.page(first=2, orderingBy='stock')
+        self.assertEqual((names, info['hasNextPage']), (['P0', 'P1'], True))
+        names, cursors, info = self.page(first=2, after=cursors[-1], orderingBy='stock')
+        self.assertEqual((names, info['hasPreviousPage']), (['P2', 'P3'], True))
+        names, _, _ = self.page(last=1, before=cursors[0], orderingBy='stock')
+        self.assertEqual(names, ['P1'])
+
+    def test_last_and_descending_order(self):
+        names, _, info = self.page(last=2, orderingBy='stock')
+        self.assertEqual((names, info['hasPreviousPage']), (['P3', 'P4'], True))
+        names, cursors, _ = self.page(first=2, orderingBy='-stock')
+        self.assertEqual(names, ['P4', 'P3'])
+        names, _, info = self.page(first=5, after=cursors[-1], orderingBy='-stock')
+        self.assertEqual((names, info['hasNextPage']), (['P2', 'P1', 'P0'], False))
+
+    def test_negative_page_sizes_are_rejected(self):
+        for name in ('first', 'last'):
+            result = self.query(self.QUERY, {name: -1})
+            self.assertEqual(result['data'], {'products': None})
+            self.assertEqual(result['errors'][0]['message'], f'Argument `{name}` must be a non-negative integer.')
+
+
+class AsyncViewTests(GraphQLTestCase):
+    QUERY = '''
+        query ($after: String) {
+            products(first: 2, after: $after, orderingBy: "stock") {
+                totalCount
+                edges { cursor node { name } }
+                pageInfo { hasNextPage hasPreviousPage }
+            }
+            orders { totalCount edges { node { customer { name } lines { product { name } quantity } } } }
+            dailySales { orderCount revenue }
+            topCustomers(first: 2) { customer { name } revenue }
+            topProducts { product { name } unitsSold }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        products = [Product.objects.create(name=f'P{i}', price=Decimal(i + 1), stock=i) for i in range(5)]
+        for i in range(3):
+            customer = Customer.objects.create(name=f'C{i}', email=f'c{i}@example.com')
+            create_order(customer, *products[:i + 1])
+        rebuild_rollups()
+
+    async def test_queries_match_the_sync_view(self):
+        from asgiref.sync import sync_to_async
+
+        first = await self.aquery(self.QUERY)
+        self.assertNotIn('errors', first)
+        self.assertEqual(first, await sync_to_async(self.query)(self.QUERY))
+        cursor = first['data']['products']['edges'][-1]['cursor']
+        second = await self.aquery(self.QUERY, {'after': cursor})
+        self.assertEqual(second, await sync_to_async(self.query)(self.QUERY, {'after': cursor}))
+        self.assertEqual([e['node']['name'] for e in second['data']['products']['edges']], ['P2', 'P3'])
+        self.assertEqual(second['data']['products']['totalCount'], 5)
+        self.assertEqual(second['data']['products']['pageInfo'], {'hasNextPage': True, 'hasPreviousPage': True})
+
+    async def test_mutations_run_in_their_transaction(self):
+        response = await AsyncClient().post(
+            '/graphql/async/',
+            {'query': 'mutation { createCustomer(input: {name: "Ada", email: "ada@example.com", '
+                      'phone: "+1234567890"}) { customer { name } } }'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['data'], {'createCustomer': {'customer': {'name': 'Ada'}}})
+        self.assertIn('crm_primary', response.cookies)
+        self.assertTrue(await Customer.objects.filter(email='ada@example.com').aexists())
+
+
+class OrderMutationTests(GraphQLTestCase):
+    CREATE = '''
+        mutation ($input: OrderInput!) {
+            createOrder(input: $input) {
+                order { totalAmount }
+                errors { line productId message requested available }
+            }
+        }
+    '''
+    BULK = '''
+        mutation ($input: [OrderInput]!) {
+            bulkCreateOrders(input: $input) {
+                created failed
+                results { row orderId message errors { line message requested available } }
+            }
+        }
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = Customer.objects.create(name='Ada', email='ada@example.com')
+        cls.engine = Product.objects.create(name='Engine', price=Decimal('10.00'), stock=3)
+        cls.gear = Product.objects.create(name='Gear', price=Decimal('2.50'), stock=1)
+
+    def order_input(self, *lines):
+        return {
+            'customerId': str(self.ada.pk),
+            'lines': [{'productId': str(product.pk), 'quantity': quantity} for product, quantity in lines],
+        }
+
+    def stock(self):
+        return dict(Product.objects.values_list('name', 'stock'))
+
+    def test_create_order_reserves_stock(self):
+        result = self.query(self.CREATE, {'input': self.order_input((self.engine, 2), (self.gear, 1))})
+        self.assertEqual(result['data']['createOrder'], {'order': {'totalAmount': '22.50'}, 'errors': None})
+        self.assertEqual(self.stock(), {'Engine': 1, 'Gear': 0})
+
+    def test_create_order_reports_every_failing_line(self):
+        order = self.order_input((self.engine, 1), (self.gear, 2))
+        order['lines'].append({'productId': 'not-a-uuid', 'quantity': 1})
+        result = self.query(self.CREATE, {'input': order})
+        self.assertIsNone(result['data']['createOrder']['order'])
+        self.assertEqual(
+            [(e['line'], e['message']) for e in result['data']['createOrder']['errors']],
+            [(2, 'Invalid product ID')]
+        )
+        result = self.query(self.CREATE, {'input': self.order_input((self.engine, 1), (self.gear, 2))})
+        self.assertEqual(result['data']['createOrder']['errors'], [{
+            'line': 1, 'productId': str(self.gear.pk), 'message': 'Insufficient stock',
+            'requested': 2, 'available': 1,
+        }])
+        # Nothing is taken when a line fails
+        self.assertEqual(self.stock(), {'Engine': 3, 'Gear': 1})
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_queries_do_not_grow_with_lines(self):
+        parts = Product.objects.bulk_create([
+            Product(name=f'Part {i}', price=Decimal('1.00'), stock=10) for i in range(50)
+        ])
+
+        def queries(count):
+            with CaptureQueriesContext(connection) as captured:
+                result = self.query(self.CREATE, {'input': self.order_input(*((p, 1) for p in parts[:count]))})
+            self.assertIsNone(result['data']['createOrder']['errors'])
+            return len(captured)
+
+        self.assertEqual(queries(5), queries(50))
+
+    def test_bulk_create_orders_rejects_rows_on_their_own(self):
+        result = self.query(self.BULK, {'input': [
+            self.order_input((self.engine, 2)),
+            self.order_input((self.engine, 2)),
+            {'customerId': 'nobody', 'productIds': [str(self.gear.pk)]},
+            {'customerId': str(self.ada.pk)},
+        ]})['data']['bulkCreateOrders']
+        self.assertEqual((result['created'], result['failed']), (1, 3))
+        ok, short, no_customer, empty = result['results']
+        self.assertIsNotNone(ok['orderId'])
+        self.assertEqual(
+            short['errors'], [{'line': 0, 'message': 'Insufficient stock', 'requested': 2, 'available': 1}]
+        )
+        self.assertEqual(no_customer['message'], 'Invalid customer ID')
+        self.assertEqual(empty['message'], 'At least one product must be selected')
+        self.assertEqual(self.stock(), {'Engine': 1, 'Gear': 1})
+
+
+class BulkCreateCustomersTests(GraphQLTestCase):
+    def test_bulk_create_customers_reports_rows(self):
+        Customer.objects.create(name='Ada', email='ada@example.com')
+        result = self.query('''
+            mutation ($input: [CustomerInput]!) {
+                bulkCreateCustomers(input: $input) { customers { name } errors }
+            }
+        ''', {'input': [
+            {'name': 'Bob', 'email': 'bob@example.com'},
+            {'name': 'Broken', 'email': 'not-an-email'},
+            {'name': 'Bob again', 'email': 'bob@example.com'},
+            {'name': 'Ada', 'email': 'ada@example.com'},
+        ]})['data']['bulkCreateCustomers']
+        self.assertEqual(result['customers'], [{'name': 'Bob'}])
+        self.assertEqual([error.split(':')[0] for error in result['errors']], ['Row 2', 'Row 3', 'Row 4'])
+        self.assertIn("Email 'bob@example.com' is duplicated in the input", result['errors'][1])
+        self.assertIn("Email 'ada@example.com' already exists", result['errors'][2])
+        self.assertEqual(Customer.objects.count(), 2)
+
+
+class BulkUpsertProductsTests(GraphQLTestCase):
+    def test_bulk_upsert_products_reports_rows(self):
+        Product.objects.create(name='Engine', sku='ENG-1', price=Decimal('10.00'), stock=4)
+        result = self.query('''
+            mutation ($input: [ProductUpsertInput]!) {
+                bulkUpsertProducts(input: $input) { created updated errors }
+            }
+        ''', {'input': [
+            {'sku': 'ENG-1', 'name': 'Engine v2', 'price': '12.00'},
+            {'sku': 'GEAR-1', 'name': 'Gear', 'price': '2.50', 'stock': 7},
+            {'sku': 'BAD-1', 'name': 'Bad', 'price': '-1'},
+            {'sku': 'GEAR-1', 'name': 'Gear again', 'price': '3.00'},
+        ]})['data']['bulkUpsertProducts']
+        self.assertEqual((result['created'], result['updated']), (1, 1))
+        self.assertEqual(result['errors'], [
+            'Row 3: Price must be positive',
+            "Row 4: SKU 'GEAR-1' is duplicated in the chunk",
+        ])
+        # Rows without a stock keep the existing one
+        self.assertEqual(
+            dict(Product.objects.values_list('sku', 'stock')), {'ENG-1': 4, 'GEAR-1': 7}
+        )
+
+
+class BenchmarkDatabaseTests(TestCase):
+    def test_refuses_the_configured_database(self):
+        from django.core.management.base import CommandError
+        from django.db import connection
+        from .benchmarks.data import benchmark_database
+
+        test_settings = {'NAME': connection.settings_dict['NAME']}
+        with mock.patch.dict(connection.settings_dict, {'TEST': test_settings}), \
+                mock.patch.object(connection.creation, 'create_test_db') as create_test_db:
+            with self.assertRaises(CommandError), benchmark_database():
+                pass
+        create_test_db.assert_not_called()
+
+
+    def test_is_seeded_checks_scale_and_seed(self):
+        from .benchmarks import data
+
+        with mock.patch.dict(data.SCALES, {'tiny': (3, 2, 3), 'small': (4, 2, 3)}):
+            data.generate('tiny', seed=7)
+            self.assertTrue(data.is_seeded('tiny', seed=7))
+            self.assertFalse(data.is_seeded('tiny', seed=42))
+            self.assertFalse(data.is_seeded('small', seed=7))
+
+class TopSellersTests(GraphQLTestCase):
+    QUERY = 'query ($first: Int!) { topCustomers(first: $first) { customer { name } revenue } }'
+
+    @classmethod
+    def setUpTestData(cls):
+        engine = Product.objects.create(name='Engine', price=Decimal('10.00'), stock=5)
+        for i in range(3):
+            customer = Customer.objects.create(name=f'C{i}', email=f'c{i}@example.com')
+            for _ in range(i + 1):
+                create_order(customer, engine)
+        rebuild_rollups()
+
+    def test_first_limits_the_ranking(self):
+        result = self.query(self.QUERY, {'first': 2})
+        self.assertEqual([row['customer']['name'] for row in result['data']['topCustomers']], ['C2', 'C1'])
+        result = self.query('{ topProducts { product { name } } }')
+        self.assertEqual(result['data']['topProducts'], [{'product': {'name': 'Engine'}}])
+
+    def test_first_must_be_positive(self):
+        for first in (0, -1):
+            result = self.query(self.QUERY, {'first': first})
+            self.assertEqual(result['errors'][0]['message'], 'Argument `first` must be a positive integer.')
+        result = self.query('{ topCustomers(first: null) { revenue } }')
+        self.assertIn("Expected value of type 'Int!', found null", result['errors'][0]['message'])
+
+    def test_first_is_capped(self):
+        from . import schema
+
+        with mock.patch.object(schema.graphene_settings, 'RELAY_CONNECTION_MAX_LIMIT', 2):
+            result = self.query(self.QUERY, {'first': 100})
+        self.assertEqual(len(result['data']['topCustomers']), 2)
+
+
+class ReplicaTests(TransactionTestCase):
+    """Reads through a real `replica` alias, set up as the runner does for TEST MIRROR."""
+
+    query = GraphQLTestCase.query
+    endpoint = GraphQLTestCase.endpoint
+    QUERY = '{ customers { edges { node { name } } } }'
+
+    @classmethod
+    def setUpClass(cls):
+        from django.conf import settings
+        from django.db import connections
+
+        replica = {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+        cls.enterClassContext(mock.patch.dict(settings.DATABASES, replica=replica))
+        connections['replica'].creation.set_as_test_mirror(connections['default'].settings_dict)
+        cls.addClassCleanup(connections.__delitem__, 'replica')
+        cls.addClassCleanup(connections['replica'].close)
+        # Declared here rather than on the class, so that the runner sets up
+        # only the default database and this class adds the mirror itself
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    def read(self):
+        """The customer names, and the queries made on the primary and on the replica."""
+        from django.db import connections
+
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            result = self.query(self.QUERY)
+        names = [edge['node']['name'] for edge in result['data']['customers']['edges']]
+        return names, len(primary), len(replica)
+
+    def test_queries_read_from_the_replica(self):
+        Customer.objects.create(name='Ada', email='ada@example.com')
+        names, primary, replica = self.read()
+        self.assertEqual(names, ['Ada'])
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_mutation_pins_the_client_to_the_primary(self):
+        response = self.client.post(
+            self.endpoint,
+            {'query': 'mutation { createCustomer(input: {name: "Ada", email: "ada@example.com", '
+                      'phone: "+1234567890"}) { message } }'},
+            content_type='application/json',
+        )
+        self.assertIn('crm_primary', response.cookies)
+        names, primary, replica = self.read()
+        self.assertEqual(names, ['Ada'])
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+        # Once the cookie expires, reads go back to the replica
+        del self.client.cookies['crm_primary']
+        names, primary, replica = self.read()
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
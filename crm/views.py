@@ -1,3 +1,555 @@
-from django.shortcuts import render
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextlib import ExitStack
+from inspect import isawaitable
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBadRequest
+from graphene_django.constants import MUTATION_ERRORS_FLAG
+from graphene_django.settings import graphene_settings
+from graphene_django.utils.utils import set_rollback
+from graphene_django.views import GraphQLView, HttpError
+from graphql import (
+    ExecutionResult,
+    OperationType,
+    execute,
+    get_operation_ast,
+    parse,
+    validate_schema,
+)
+from graphql.error import GraphQLError
+from graphql.validation import validate
+
+from .cache import response_cache
+from .instrumentation import (
+    ProfilingMiddleware,
+    get_profile,
+    metrics,
+    profile_phase,
+    profile_requested,
+    profiles_resolvers,
+    report,
+    start_profile
+)
+from .exports import FORMATS, ExportError, stream_export
+from .complexity import QueryCostRule
+from .replicas import is_sticky, mark_sticky, replica_alias, set_sticky_cookie, use_replica
+
+
+def sql_profile(profile):
+    """
+    Install `profile` as the execute_wrapper of every database connection
+    (primary and replica) of the current thread. Returns the ExitStack
+    that removes them again.
+    """
+    stack = ExitStack()
+    if profile is not None:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(profile))
+    return stack
+
+
+def query_hash(query):
+    return hashlib.sha256(query.encode('utf-8')).hexdigest()
+
+
+class DocumentCache:
+    """
+    Thread-safe LRU of parsed documents and their validation errors,
+    keyed by the sha256 of the query text.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+document_cache = DocumentCache(getattr(settings, 'GRAPHQL_DOCUMENT_CACHE_SIZE', 256))
+
+
+class PersistedQueryError(GraphQLError):
+    pass
+
+
+class CRMGraphQLView(GraphQLView):
+    """
+    GraphQLView with automatic persisted queries (APQ), a process-wide
+    cache of parsed and validated documents, the opt-in response cache and
+    per-request depth/cost budgets (reported under `extensions.cost`).
+
+    Clients may send `extensions.persistedQuery.sha256Hash` instead of the
+    query text; unknown hashes answer `PersistedQueryNotFound` so the client
+    can retry with the full query, which is then registered under its hash.
+    """
+
+    persisted_query_cache = getattr(settings, 'GRAPHQL_PERSISTED_QUERY_CACHE', 'default')
+    persisted_query_timeout = None
+
+    def dispatch(self, request, *args, **kwargs):
+        return set_sticky_cookie(request, super().dispatch(request, *args, **kwargs))
+
+    def get_response(self, request, data, show_graphiql=False):
+        profile = start_profile(request)
+        # The profile is also the execute_wrapper counting this request's SQL
+        with sql_profile(profile):
+            try:
+                data = self.resolve_persisted_query(request, data)
+            except PersistedQueryError as e:
+                return self.persisted_query_error(request, data, e)
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+            execution_result = self.execute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        self.finish_profile(request, execution_result)
+
+        if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+            set_rollback()
+
+        if execution_result and execution_result.errors:
+            set_rollback()
+        return self.build_response(request, execution_result, id, show_graphiql)
+
+    def finish_profile(self, request, execution_result):
+        """
+        Report the request profile to the metrics registry and, when the
+        profiling header is set, add it to the response extensions.
+        """
+        profile = get_profile(request)
+        if profile is None or execution_result is None:
+            return
+        report(profile.operation, profile, errors=bool(execution_result.errors))
+        if profile_requested(request):
+            execution_result.extensions = {
+                **(execution_result.extensions or {}),
+                "profile": profile.as_extension(),
+            }
+
+    def persisted_query_error(self, request, data, error):
+        response = {"errors": [self.format_error(error)]}
+        if self.batch:
+            response["id"] = data.get("id")
+            response["status"] = 200
+        return self.json_encode(request, response), 200
+
+    def build_response(self, request, execution_result, id, show_graphiql=False):
+        """Serialize an ExecutionResult; returns (body, status code)."""
+        status_code = 200
+        if execution_result:
+            response = {}
+
+            if execution_result.errors:
+                response["errors"] = [
+                    self.format_error(e) for e in execution_result.errors
+                ]
+
+            if execution_result.errors and any(
+                not getattr(e, "path", None) for e in execution_result.errors
+            ):
+                status_code = 400
+            else:
+                response["data"] = execution_result.data
+
+            if execution_result.extensions:
+                response["extensions"] = execution_result.extensions
+
+            if self.batch:
+                response["id"] = id
+                response["status"] = status_code
+
+            result = self.json_encode(request, response, pretty=show_graphiql)
+        else:
+            result = None
+
+        return result, status_code
+
+    def resolve_persisted_query(self, request, data):
+        extensions = request.GET.get("extensions") or data.get("extensions")
+        if not extensions:
+            return data
+        if isinstance(extensions, str):
+            try:
+                extensions = json.loads(extensions)
+            except ValueError:
+                raise HttpError(HttpResponseBadRequest("Extensions are invalid JSON."))
+
+        persisted = (extensions or {}).get("persistedQuery")
+        if not persisted:
+            return data
+        if persisted.get("version") != 1:
+            raise PersistedQueryError(
+                "Unsupported persisted query version",
+                extensions={"code": "PERSISTED_QUERY_VERSION_NOT_SUPPORTED"},
+            )
+
+        sha = persisted.get("sha256Hash")
+        cache = caches[self.persisted_query_cache]
+        key = f"crm:apq:{sha}"
+        query = request.GET.get("query") or data.get("query")
+
+        if query:
+            if query_hash(query) != sha:
+                raise PersistedQueryError(
+                    "provided sha does not match query",
+                    extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"},
+                )
+            cache.set(key, query, self.persisted_query_timeout)
+            return data
+
+        query = cache.get(key)
+        if query is None:
+            raise PersistedQueryError(
+                "PersistedQueryNotFound",
+                extensions={"code": "PERSISTED_QUERY_NOT_FOUND"},
+            )
+        data = data.copy()
+        data["query"] = query
+        return data
+
+    def get_document(self, query):
+        """
+        Return (document, validation errors) for `query`, parsing and
+        validating it only the first time it is seen.
+        """
+        schema = self.schema.graphql_schema
+        key = (id(schema), query_hash(query))
+        entry = document_cache.get(key)
+        if entry is None:
+            document = parse(query)
+            errors = validate(
+                schema,
+                document,
+                self.validation_rules,
+                graphene_settings.MAX_VALIDATION_ERRORS,
+            )
+            entry = (document, errors)
+            document_cache.set(key, entry)
+        return entry
+
+    def prepare_request(self, request, query, variables, operation_name, show_graphiql=False):
+        """
+        Parse, validate and budget-check a request. Returns
+        (document, operation_ast, extensions, early result); when the early
+        result is not None (errors, or GraphiQL without a query) it is the
+        response and nothing should be executed.
+        """
+        if not query:
+            if show_graphiql:
+                return None, None, None, None
+            raise HttpError(HttpResponseBadRequest("Must provide query string."))
+
+        schema = self.schema.graphql_schema
+
+        schema_validation_errors = validate_schema(schema)
+        if schema_validation_errors:
+            return None, None, None, ExecutionResult(data=None, errors=schema_validation_errors)
+
+        try:
+            with profile_phase(request, "parse_validate"):
+                document, validation_errors = self.get_document(query)
+        except Exception as e:
+            return None, None, None, ExecutionResult(errors=[e])
+
+        operation_ast = get_operation_ast(document, operation_name)
+        profile = get_profile(request)
+        if profile is not None and operation_ast is not None:
+            profile.operation = operation_ast.name.value if operation_ast.name else None
+
+        if (
+            request.method.lower() == "get"
+            and operation_ast is not None
+            and operation_ast.operation != OperationType.QUERY
+        ):
+            if show_graphiql:
+                return None, None, None, None
+
+            raise HttpError(
+                HttpResponseNotAllowed(
+                    ["POST"],
+                    "Can only perform a {} operation from a POST request.".format(
+                        operation_ast.operation.value
+                    ),
+                )
+            )
+
+        if validation_errors:
+            return None, None, None, ExecutionResult(data=None, errors=validation_errors)
+
+        # Depth/cost depend on the variables, so this rule runs on every request
+        cost_rule = QueryCostRule.for_request(variables)
+        with profile_phase(request, "cost"):
+            cost_errors = validate(schema, document, [cost_rule])
+        if cost_errors:
+            return None, None, None, ExecutionResult(data=None, errors=cost_errors)
+        extensions = {}
+        if operation_ast is not None:
+            cost = cost_rule.report.get(operation_ast.name.value if operation_ast.name else None)
+            if cost is not None:
+                extensions["cost"] = cost
+        return document, operation_ast, extensions, None
+
+    def get_middleware(self, request):
+        middleware = super().get_middleware(request)
+        if middleware and not profiles_resolvers(request):
+            # Resolvers run unwrapped unless they are being timed
+            middleware = [m for m in middleware if not isinstance(m, ProfilingMiddleware)]
+        return middleware
+
+    def get_execute_options(self, request, variables, operation_name):
+        execute_options = {
+            "root_value": self.get_root_value(request),
+            "context_value": self.get_context(request),
+            "variable_values": variables,
+            "operation_name": operation_name,
+            "middleware": self.get_middleware(request),
+        }
+        if self.execution_context_class:
+            execute_options["execution_context_class"] = self.execution_context_class
+        return execute_options
+
+    def execute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        document, operation_ast, extensions, early_result = self.prepare_request(
+            request, query, variables, operation_name, show_graphiql
+        )
+        if document is None:
+            return early_result
+        schema = self.schema.graphql_schema
+
+        try:
+            execute_options = self.get_execute_options(request, variables, operation_name)
+
+            if operation_ast is not None and operation_ast.operation == OperationType.MUTATION:
+                # Later operations of this request, and of this client for a
+                # few seconds, read their own writes from the primary
+                mark_sticky(request)
+
+            if (
+                operation_ast is not None
+                and operation_ast.operation == OperationType.MUTATION
+                and (
+                    graphene_settings.ATOMIC_MUTATIONS is True
+                    or connection.settings_dict.get("ATOMIC_MUTATIONS", False) is True
+                )
+            ):
+                with transaction.atomic(), profile_phase(request, "execute"):
+                    result = execute(schema, document, **execute_options)
+                    if getattr(request, MUTATION_ERRORS_FLAG, False) is True:
+                        transaction.set_rollback(True)
+                result.extensions = extensions or None
+                return result
+
+            cache_key = None
+            if response_cache.enabled:
+                cache_key = response_cache.key_for(schema, document, operation_ast, variables)
+                if cache_key is not None:
+                    data = response_cache.get(cache_key)
+                    if data is not None:
+                        return ExecutionResult(data=data, extensions=extensions or None)
+
+            with use_replica(self.reads_from_replica(request, operation_ast, cache_key)), profile_phase(request, "execute"):
+                result = execute(schema, document, **execute_options)
+            if cache_key is not None and not result.errors:
+                response_cache.set(cache_key, result.data)
+            result.extensions = extensions or None
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+    @staticmethod
+    def reads_from_replica(request, operation_ast, cache_key=None):
+        """
+        Queries read from the replica unless the client wrote recently.
+        Response cache misses are filled from the primary: a lagging replica
+        could otherwise store pre-write data under the version token that
+        write just bumped.
+        """
+        return (
+            operation_ast is not None
+            and operation_ast.operation == OperationType.QUERY
+            and cache_key is None
+            and not is_sticky(request)
+        )
+
+
+class AsyncCRMGraphQLView(CRMGraphQLView):
+    """
+    CRMGraphQLView for ASGI deployments.
+
+    Queries run on graphql-core's async executor: the root connection and
+    list resolvers fetch through the async ORM (async iteration, acount()),
+    so independent root fields are awaited concurrently and the request
+    holds no worker thread while waiting on the database. Nested relations
+    come from the optimizer's prefetches on the same path. Mutations keep
+    their synchronous, transactional execution in a worker thread.
+    """
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if request.method.lower() not in ("get", "post"):
+                raise HttpError(
+                    HttpResponseNotAllowed(
+                        ["GET", "POST"], "GraphQL only supports GET and POST requests."
+                    )
+                )
+
+            data = self.parse_body(request)
+            if self.graphiql and self.can_display_graphiql(request, data):
+                # Rendering GraphiQL does not touch the database
+                return super().dispatch(request, *args, **kwargs)
+
+            if self.batch:
+                responses = [await self.aget_response(request, entry) for entry in data]
+                result = "[{}]".format(",".join([response[0] for response in responses]))
+                status_code = (
+                    responses
+                    and max(responses, key=lambda response: response[1])[1]
+                    or 200
+                )
+            else:
+                result, status_code = await self.aget_response(request, data)
+
+            return set_sticky_cookie(
+                request, HttpResponse(status=status_code, content=result, content_type="application/json")
+            )
+
+        except HttpError as e:
+            response = e.response
+            response["Content-Type"] = "application/json"
+            response.content = self.json_encode(request, {"errors": [self.format_error(e)]})
+            return response
+
+    async def aget_response(self, request, data, show_graphiql=False):
+        profile = start_profile(request)
+        # The async ORM runs its queries on this request's sync worker
+        # thread, so the SQL counter is installed on that thread's connection.
+        # Those queries are counted per request, not per resolver.
+        sql_wrapper = None
+        if profile is not None:
+            sql_wrapper = await sync_to_async(sql_profile)(profile)
+        try:
+            try:
+                data = await sync_to_async(self.resolve_persisted_query)(request, data)
+            except PersistedQueryError as e:
+                return self.persisted_query_error(request, data, e)
+            query, variables, operation_name, id = self.get_graphql_params(request, data)
+
+            execution_result = await self.aexecute_graphql_request(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        finally:
+            if sql_wrapper is not None:
+                await sync_to_async(sql_wrapper.__exit__)(None, None, None)
+        self.finish_profile(request, execution_result)
+        return self.build_response(request, execution_result, id, show_graphiql)
+
+    async def aexecute_graphql_request(
+        self, request, data, query, variables, operation_name, show_graphiql=False
+    ):
+        document, operation_ast, extensions, early_result = self.prepare_request(
+            request, query, variables, operation_name, show_graphiql
+        )
+        if document is None:
+            return early_result
+        if operation_ast is not None and operation_ast.operation != OperationType.QUERY:
+            return await sync_to_async(self.execute_graphql_request)(
+                request, data, query, variables, operation_name, show_graphiql
+            )
+        schema = self.schema.graphql_schema
+
+        try:
+            cache_key = None
+            if response_cache.enabled:
+                cache_key = await sync_to_async(response_cache.key_for)(
+                    schema, document, operation_ast, variables
+                )
+                if cache_key is not None:
+                    data = await sync_to_async(response_cache.get)(cache_key)
+                    if data is not None:
+                        return ExecutionResult(data=data, extensions=extensions or None)
+
+            with use_replica(self.reads_from_replica(request, operation_ast, cache_key)), profile_phase(request, "execute"):
+                result = execute(
+                    schema, document, **self.get_execute_options(request, variables, operation_name)
+                )
+                if isawaitable(result):
+                    result = await result
+            if cache_key is not None and not result.errors:
+                await sync_to_async(response_cache.set)(cache_key, result.data)
+            result.extensions = extensions or None
+            return result
+        except Exception as e:
+            return ExecutionResult(errors=[e])
+
+
+def metrics_view(request):
+    """GraphQL request, SQL, resolver and response cache metrics in the Prometheus text format."""
+    stats = response_cache.stats()
+    body = metrics.render() + "".join([
+        "# HELP graphql_response_cache_requests_total Response cache lookups.\n",
+        "# TYPE graphql_response_cache_requests_total counter\n",
+        f'graphql_response_cache_requests_total{{result="hit"}} {stats["hits"]}\n',
+        f'graphql_response_cache_requests_total{{result="miss"}} {stats["misses"]}\n',
+    ])
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def export_view(request, kind):
+    """
+    Stream orders, customers or products as CSV (default) or NDJSON to
+    staff users. Any other query parameters are passed to the model's
+    FilterSet.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not request.user.is_staff:
+        # Exports carry every customer's contact details
+        return JsonResponse({"error": "Exports are only available to staff users."}, status=403)
+    params = request.GET.copy()
+    fmt = params.pop("format", ["csv"])[-1]
+    try:
+        chunk_size = int(params.pop("chunk_size", ["2000"])[-1])
+        rows = stream_export(kind, fmt, filters=params, chunk_size=chunk_size, using=replica_alias())
+    except (ExportError, ValueError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    response = StreamingHttpResponse(rows, content_type=FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{kind}.{fmt}"'
+    return response